@@ -6,38 +6,97 @@ Functions:
     load_config(path: str | None) -> dict
 """
 from __future__ import annotations
+import json
+import os
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional, Dict
 
 try:  # Python 3.11+
     import tomllib  # type: ignore
 except Exception:  # pragma: no cover
-    tomllib = None  # type: ignore
+    try:
+        import tomli as tomllib  # type: ignore  # fallback for older Python
+    except Exception:
+        tomllib = None  # type: ignore
 
 
  # template content moved to config/cityu.toml per user request
 
 
+def _cache_path(path: str) -> str:
+    return path + ".cache.json"
+
+
+def _read_json_cache(path: str, mtime_ns: int, size: int) -> Optional[Dict]:
+    """Parsed config from the JSON sidecar, if it was written for this exact file version."""
+    try:
+        with open(_cache_path(path), "r", encoding="utf-8") as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(cached, dict) or cached.get("mtime_ns") != mtime_ns or cached.get("size") != size:
+        return None
+    data = cached.get("data")
+    return data if isinstance(data, dict) else None
+
+
+def _write_json_cache(path: str, mtime_ns: int, size: int, data: Dict) -> None:
+    cache = _cache_path(path)
+    tmp = cache + ".tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"mtime_ns": mtime_ns, "size": size, "data": data}, f, ensure_ascii=False)
+        os.replace(tmp, cache)
+    except (OSError, TypeError, ValueError):
+        # read-only config dir, or values JSON cannot hold (TOML dates)
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+
+
+@lru_cache(maxsize=32)
+def _parse_toml(path: str, mtime_ns: int, size: int) -> Dict:
+    """Parse one TOML file; memoized per (path, mtime, size) so edits are picked up.
+
+    The parsed result is also kept in a JSON sidecar (<file>.cache.json),
+    so later processes skip tomllib while the file is unchanged.
+    """
+    data = _read_json_cache(path, mtime_ns, size)
+    if data is not None:
+        return data
+    if tomllib is None:
+        return {}
+    try:
+        with open(path, "rb") as f:
+            data = tomllib.load(f)
+    except Exception:
+        return {}
+    if not isinstance(data, dict):
+        return {}
+    _write_json_cache(path, mtime_ns, size, data)
+    return data
+
+
 def load_config(path: Optional[str]) -> Dict:
     """Load a TOML config file.
 
     If path is None, try default config/cityu.toml.
-    Returns a dict or empty dict if not found / parse failed.
+    Always returns a dict: {} if the file is missing or fails to parse,
+    so callers can use cfg.get(...) without a type check.
+    Repeated loads of an unchanged file return the same (shared) dict,
+    so callers must not modify it.
     """
     if path:
         cfg_path = Path(path)
     else:
         cfg_path = Path(__file__).parent.parent / "config" / "cityu.toml"
-    if not cfg_path.exists():
-        return {}
-    if tomllib is None:
-        return {}
     try:
-        with open(cfg_path, "rb") as f:
-            data = tomllib.load(f)
-        return data or {}
-    except Exception:
+        st = os.stat(cfg_path)
+    except OSError:
         return {}
+    return _parse_toml(os.path.abspath(cfg_path), st.st_mtime_ns, st.st_size)
 
 
 __all__ = ["load_config"]
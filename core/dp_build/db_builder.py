@@ -6,9 +6,14 @@ import sqlite3
 import sys
 from typing import Optional
 
-from core.scraper.http import fetch_html
-from core.scraper.cache import maybe_read_cache, write_cache
+from core.net.pool import get_session
+from core.scraper.cache import fetch_cached
 from core.dp_build.parsers import parse_major_page
+from core.dp_build.models import SCHEMA_VERSION, SEMESTER_MASKS
+
+_CODE_RE = re.compile(r"[A-Z]{2,}\d{3,4}")
+_WS_RE = re.compile(r"\s+")
+_NIL_SET = frozenset({"nil", "none", "n/a", "na", "-", ""})
 
 
 def build_course_db(
@@ -19,17 +24,20 @@ def build_course_db(
     timeout: float = 15.0,
     retries: int = 3,
     verbose: bool = False,
-    concurrency: int = 4,
+    concurrency: int = 16,
     reset: bool = False,
     cache_dir: Optional[str] = None,
-    out_dir: Optional[str] = None
+    out_dir: Optional[str] = None,
+    revalidate: bool = False,
+    host_qps: float = 0.0,
+    session=None
 ) -> dict:
     """Build SQLite database from a major curriculum page.
     
     Args:
         major_url: URL of the major curriculum page
         db_path: path to SQLite database file
-        delay: delay between requests
+        delay: pause after each request, per worker
         timeout: request timeout
         retries: number of retries for failed requests
         verbose: print progress messages
@@ -37,27 +45,34 @@ def build_course_db(
         reset: drop existing tables before creating
         cache_dir: directory for HTML cache
         out_dir: output directory for failed courses log
+        revalidate: re-check cached pages with conditional requests (ETag / Last-Modified)
+        host_qps: cap on requests per second to the site across all workers (0 = no cap)
+        session: HTTP client to reuse (default: the shared pool from core.net)
         
     Returns:
         dict with statistics: courses, prerequisites, exclusions counts
     """
+    # One keep-alive pool for the major page and all course pages
+    if session is None:
+        session = get_session(max(1, concurrency))
+    
     # Fetch major page HTML
-    html = maybe_read_cache(cache_dir, major_url)
-    if html is None:
-        html = fetch_html(major_url, timeout=timeout, retries=retries, delay=delay)
-        write_cache(cache_dir, major_url, html)
+    html = fetch_cached(cache_dir, major_url, revalidate=revalidate, timeout=timeout, retries=retries, delay=delay, host_qps=host_qps, session=session)
     
     # Parse major page and fetch course details
     mp = parse_major_page(
         major_url,
         html,
         include_courses=True,
+        session=session,
         delay=delay,
         timeout=timeout,
         retries=retries,
         verbose=verbose,
         concurrency=concurrency,
         cache_dir=cache_dir,
+        revalidate=revalidate,
+        host_qps=host_qps,
     )
     
     # Ensure db directory exists
@@ -67,6 +82,12 @@ def build_course_db(
     conn = sqlite3.connect(db_path)
     cur = conn.cursor()
     
+    # Bulk-load settings: WAL + NORMAL sync avoids an fsync per statement
+    cur.execute("PRAGMA journal_mode=WAL")
+    cur.execute("PRAGMA synchronous=NORMAL")
+    cur.execute("PRAGMA temp_store=MEMORY")
+    cur.execute("PRAGMA cache_size=-20000")
+    
     if reset:
         cur.execute("DROP TABLE IF EXISTS courses")
         cur.execute("DROP TABLE IF EXISTS prerequisites")
@@ -81,7 +102,7 @@ def build_course_db(
         "offering_unit TEXT, "
         "credit_units TEXT, "
         "duration TEXT, "
-        "semester TEXT, "
+        "semester INTEGER, "
         "aims TEXT, "
         "assessment_json TEXT, "
         "pdf_url TEXT, "
@@ -105,71 +126,94 @@ def build_course_db(
         "requirement_text TEXT)"
     )
     
-    # Insert course data
+    # Secondary indexes for the query workload (reverse prereq lookups, semester filter)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_prereq_prereqcode ON prerequisites(prereq_code)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_courses_semester ON courses(semester)")
+    
+    # Older DBs stored semester labels ('A', 'B', 'A, B'); convert them, or rows
+    # that are not re-scraped below would drop out of the semester filter
+    if cur.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+        cur.executemany("UPDATE courses SET semester = ? WHERE semester = ?",
+                        [(mask, label) for label, mask in SEMESTER_MASKS.items()])
+        cur.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    
+    conn.commit()
+    
+    # Collect rows first, then insert each table with one executemany
+    course_rows = []
+    prereq_rows = []
+    excl_rows = []
+    special_rows = []
+    failed = []
     for c in mp.courses:
         code = c.get("course_code")
         if not code:
             continue
         
-        cur.execute(
-            "INSERT OR REPLACE INTO courses VALUES (?,?,?,?,?,?,?,?,?,?)",
-            (
-                code,
-                c.get("course_title"),
-                c.get("offering_unit"),
-                c.get("credit_units"),
-                c.get("duration"),
-                c.get("semester"),
-                c.get("aims"),
-                json.dumps(c.get("assessment") or {}, ensure_ascii=False),
-                c.get("pdf_url"),
-                c.get("url"),
-            )
-        )
+        course_rows.append((
+            code,
+            c.get("course_title"),
+            c.get("offering_unit"),
+            c.get("credit_units"),
+            c.get("duration"),
+            SEMESTER_MASKS.get(c.get("semester")),
+            c.get("aims"),
+            json.dumps(c.get("assessment") or {}, ensure_ascii=False),
+            c.get("pdf_url"),
+            c.get("url"),
+        ))
         
-        # Extract and insert prerequisites
+        # Extract prerequisites
         prereq_text = c.get("prerequisites") or ""
-        prereq_codes = set(re.findall(r"[A-Z]{2,}\d{3,4}", prereq_text))
+        prereq_codes = set(_CODE_RE.findall(prereq_text))
         
         # Check if there are no prerequisite codes but there is text content
         # This indicates special text requirements
         if not prereq_codes and prereq_text and prereq_text.strip():
             # Clean up the text (remove extra whitespace)
-            cleaned_text = re.sub(r'\s+', ' ', prereq_text).strip()
+            cleaned_text = _WS_RE.sub(' ', prereq_text).strip()
             # Skip if it's just "Nil" or "None" or similar, or contains only HKDSE requirements
-            lower_text = cleaned_text.lower()
-            is_hkdse_only = 'hkdse' in lower_text or 'dse' in lower_text
-            is_nil = lower_text in ['nil', 'none', 'n/a', 'na', '-', '']
+            low = cleaned_text.lower()
+            is_hkdse_only = 'dse' in low  # also covers 'hkdse'
+            is_nil = low in _NIL_SET
             
             # Only store if it's not nil and not HKDSE-only requirement
             if not is_nil and not is_hkdse_only:
-                cur.execute(
-                    "INSERT OR REPLACE INTO special_requirements VALUES (?,?)",
-                    (code, cleaned_text)
-                )
+                special_rows.append((code, cleaned_text))
         
-        # Insert normal prerequisite codes
-        for p in prereq_codes:
-            if p != code:
-                cur.execute("INSERT OR IGNORE INTO prerequisites VALUES (?,?)", (code, p))
+        # Normal prerequisite codes (a course never lists itself)
+        prereq_codes.discard(code)
+        prereq_rows.extend((code, p) for p in prereq_codes)
         
-        # Extract and insert exclusions
-        excl_codes = set(re.findall(r"[A-Z]{2,}\d{3,4}", c.get("exclusive_courses") or ""))
-        for e in excl_codes:
-            if e != code:
-                cur.execute("INSERT OR IGNORE INTO exclusions VALUES (?,?)", (code, e))
+        # Extract exclusions
+        excl_codes = set(_CODE_RE.findall(c.get("exclusive_courses") or ""))
+        excl_codes.discard(code)
+        excl_rows.extend((code, e) for e in excl_codes)
         
-        # Log failed courses
-        if c.get("error") and verbose and out_dir:
-            try:
-                os.makedirs(out_dir, exist_ok=True)
-                with open(os.path.join(out_dir, "failed_courses.txt"), "a", encoding="utf-8") as f:
-                    f.write(f"{code}\t{c.get('url')}\t{c.get('error')}\n")
-            except Exception:
-                pass
+        # Remember failed courses; they are logged in one write below
+        if c.get("error"):
+            failed.append(f"{code}\t{c.get('url')}\t{c.get('error')}\n")
     
+    # Log failed courses
+    if failed and verbose and out_dir:
+        try:
+            os.makedirs(out_dir, exist_ok=True)
+            with open(os.path.join(out_dir, "failed_courses.txt"), "a", encoding="utf-8") as f:
+                f.writelines(failed)
+        except Exception:
+            pass
+    
+    # Insert course data in a single transaction
+    cur.execute("BEGIN")
+    cur.executemany("INSERT OR REPLACE INTO courses VALUES (?,?,?,?,?,?,?,?,?,?)", course_rows)
+    cur.executemany("INSERT OR IGNORE INTO prerequisites VALUES (?,?)", prereq_rows)
+    cur.executemany("INSERT OR IGNORE INTO exclusions VALUES (?,?)", excl_rows)
+    cur.executemany("INSERT OR REPLACE INTO special_requirements VALUES (?,?)", special_rows)
     conn.commit()
     
+    # Refresh planner statistics so the indexes above get picked
+    cur.execute("ANALYZE")
+    
     # Get statistics
     cur.execute("SELECT COUNT(*) FROM courses")
     n_courses = cur.fetchone()[0]
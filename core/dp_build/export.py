@@ -2,7 +2,7 @@
 import csv
 import json
 from dataclasses import asdict
-from typing import List
+from typing import Iterable, List
 
 from core.dp_build.models import MajorPage, StructureTable
 
@@ -25,12 +25,43 @@ def save_json(objs: List[MajorPage], out_path: str) -> None:
         json.dump([majorpage_to_dict(o) for o in objs], f, ensure_ascii=False, indent=2)
 
 
-def save_csv(objs: List[MajorPage], out_path: str) -> None:
+def save_json_stream(objs: Iterable[MajorPage], out_path: str) -> int:
+    """Save major pages as JSON, writing each record as soon as it arrives.
+    
+    Produces the same file as save_json, but only one record is held in
+    memory at a time, so objs can be a generator (see iter_major_pages).
+    
+    Args:
+        objs: iterable of MajorPage objects
+        out_path: output file path
+        
+    Returns:
+        Number of records written
+    """
+    count = 0
+    with open(out_path, "w", encoding="utf-8") as f:
+        f.write("[")
+        for o in objs:
+            # json.dumps never emits raw newlines inside strings, so this
+            # re-indents the record exactly as json.dump(list, indent=2) would
+            rec = json.dumps(majorpage_to_dict(o), ensure_ascii=False, indent=2).replace("\n", "\n  ")
+            f.write(("," if count else "") + "\n  " + rec)
+            count += 1
+        f.write("\n]" if count else "]")
+    return count
+
+
+def save_csv(objs: Iterable[MajorPage], out_path: str) -> int:
     """Save major pages as CSV.
     
+    Rows are written as objs is iterated, so a generator is streamed to disk.
+    
     Args:
-        objs: list of MajorPage objects
+        objs: iterable of MajorPage objects
         out_path: output file path
+        
+    Returns:
+        Number of rows written
     """
     def join_list(lst: List[str]) -> str:
         return "\n".join(lst)
@@ -55,10 +86,12 @@ def save_csv(objs: List[MajorPage], out_path: str) -> None:
         "structure_tables",
         "remarks",
     ]
+    count = 0
     with open(out_path, "w", encoding="utf-8", newline="") as f:
         writer = csv.DictWriter(f, fieldnames=fieldnames)
         writer.writeheader()
         for o in objs:
+            count += 1
             writer.writerow({
                 "url": o.url,
                 "program_title": o.program_title or "",
@@ -68,3 +101,4 @@ def save_csv(objs: List[MajorPage], out_path: str) -> None:
                 "structure_tables": flatten_tables(o.structure_tables),
                 "remarks": o.remarks or "",
             })
+    return count
@@ -1,6 +1,15 @@
 from dataclasses import dataclass
 from typing import List, Optional, Dict, Any
 
+# Semester bitmask values stored in courses.semester
+SEMESTER_A = 1
+SEMESTER_B = 2
+SEMESTER_LABELS = {SEMESTER_A: 'A', SEMESTER_B: 'B', SEMESTER_A | SEMESTER_B: 'A, B'}
+SEMESTER_MASKS = {label: mask for mask, label in SEMESTER_LABELS.items()}
+
+# PRAGMA user_version of the course DB; before 1, courses.semester held the labels above
+SCHEMA_VERSION = 1
+
 @dataclass
 class StructureTable:
     caption: Optional[str]
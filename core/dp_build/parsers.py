@@ -1,16 +1,36 @@
+import asyncio
+import multiprocessing
 import re
 import os
-from typing import Optional, List, Dict, Any, Set
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from bs4 import BeautifulSoup
+import threading
+from typing import Optional, List, Dict, Any, Set, Tuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
+from bs4 import BeautifulSoup, Tag
+import lxml.etree
+import lxml.html
 import requests
 
-from .models import MajorPage, StructureTable
-from core.scraper.http import fetch_html
+try:  # optional: asyncio course fetching
+    import aiohttp  # type: ignore
+except ImportError:  # pragma: no cover
+    aiohttp = None  # type: ignore
+
+from .models import MajorPage, StructureTable, SEMESTER_A, SEMESTER_B, SEMESTER_LABELS
+from core.scraper.cache import fetch_cached, fetch_cached_async
+from core.net.pool import HAS_HTTPX, get_session
+
+_CODE_RE = re.compile(r"[A-Z]{2,}\d{3,4}")
+_WS_RE = re.compile(r"\s+")
+_CAPTION_CLASS_RE = re.compile(r"formText|colorTitle|formTitle")
+_TABLE_KEYWORDS_RE = re.compile(r"Course Code|Credit Units|GE|SDSC", re.I)
+
+# lxml parsers must not be shared between threads, so one per thread
+_parser_local = threading.local()
 
 
 def normalize_space(s: str) -> str:
-    return re.sub(r"\s+", " ", s).strip()
+    return _WS_RE.sub(" ", s).strip()
 
 
 def text_or_none(el) -> Optional[str]:
@@ -19,48 +39,69 @@ def text_or_none(el) -> Optional[str]:
     return normalize_space(el.get_text(" "))
 
 
+def _txt(root, eid: str) -> Optional[str]:
+    """Normalized text of the element with id ``eid`` (None if missing or empty)."""
+    el = root.get_element_by_id(eid, None)
+    if el is None or (not el.text and len(el) == 0):
+        return None
+    return normalize_space(" ".join(el.itertext()))
+
+
+def _course_root(html: str):
+    """lxml root of a decoded course page.
+    
+    The text is handed to lxml as UTF-8 bytes with the encoding fixed, since lxml
+    rejects str input carrying an XML encoding declaration. An empty document
+    gives an empty root, so every field is simply missing (as with BeautifulSoup).
+    """
+    parser = getattr(_parser_local, "parser", None)
+    if parser is None:
+        parser = _parser_local.parser = lxml.html.HTMLParser(encoding="utf-8")
+    try:
+        return lxml.html.fromstring(html.encode("utf-8"), parser=parser)
+    except lxml.etree.ParserError:  # "Document is empty"
+        return lxml.html.Element("html")
+
+
 def parse_course_page(code: str, url: str, html: str) -> Dict[str, Any]:
-    soup = BeautifulSoup(html, "lxml")
-    title_el = soup.select_one("#div_course_code_and_title")
-    full_title = normalize_space(title_el.get_text(" ")) if title_el else code
+    # Course pages only need id lookups, so skip BeautifulSoup and use lxml directly
+    root = _course_root(html)
+    full_title = _txt(root, "div_course_code_and_title")
+    if full_title is None:
+        full_title = code
     course_title = full_title.split(" - ", 1)[1] if " - " in full_title else full_title
-    offering_unit = text_or_none(soup.select_one("#div_offering_dept"))
-    credit_units = text_or_none(soup.select_one("#div_course_credits"))
-    duration = text_or_none(soup.select_one("#div_course_duration"))
+    offering_unit = _txt(root, "div_offering_dept")
+    credit_units = _txt(root, "div_course_credits")
+    duration = _txt(root, "div_course_duration")
     
     # Extract semester from course offering term (e.g., "Semester A 2025/26" -> "A")
-    semester_raw = text_or_none(soup.select_one("#div_course_offering_term"))
+    semester_raw = _txt(root, "div_course_offering_term")
     semester = None
     if semester_raw:
-        # Extract semester letter (A, B, or both)
-        if 'Semester A' in semester_raw and 'Semester B' in semester_raw:
-            semester = 'A, B'
-        elif 'Semester A' in semester_raw:
-            semester = 'A'
-        elif 'Semester B' in semester_raw:
-            semester = 'B'
+        mask = (SEMESTER_A if 'Semester A' in semester_raw else 0) | (SEMESTER_B if 'Semester B' in semester_raw else 0)
+        semester = SEMESTER_LABELS.get(mask)
     
-    prerequisites_raw = text_or_none(soup.select_one("#div_prerequisites"))
+    prerequisites_raw = _txt(root, "div_prerequisites")
     prerequisites = prerequisites_raw.replace("\n", " ") if prerequisites_raw else None
-    exclusive_raw = text_or_none(soup.select_one("#div_exclusive_courses"))
+    exclusive_raw = _txt(root, "div_exclusive_courses")
     exclusive_courses = None
     if exclusive_raw:
-        exclusive_courses = ", ".join(sorted(set(re.findall(r"[A-Z]{2,}\d{3,4}", exclusive_raw))))
-    aims = text_or_none(soup.select_one("#div_course_aims"))
+        exclusive_courses = ", ".join(sorted(set(_CODE_RE.findall(exclusive_raw))))
+    aims = _txt(root, "div_course_aims")
     assessment = {
-        "coursework_pct": text_or_none(soup.select_one("#div_assessment_coursework_pct")),
-        "exam_pct": text_or_none(soup.select_one("#div_assessment_exam_pct")),
-        "exam_duration": text_or_none(soup.select_one("#div_exam_duration")),
-        "min_exam_pass_pct": text_or_none(soup.select_one("#div_min_exam_pass_pct")),
-        "min_cont_pass_pct": text_or_none(soup.select_one("#div_min_cont_pass_pct")),
-        "assessment_notes": text_or_none(soup.select_one("#div_assessment_supp")),
+        "coursework_pct": _txt(root, "div_assessment_coursework_pct"),
+        "exam_pct": _txt(root, "div_assessment_exam_pct"),
+        "exam_duration": _txt(root, "div_exam_duration"),
+        "min_exam_pass_pct": _txt(root, "div_min_exam_pass_pct"),
+        "min_cont_pass_pct": _txt(root, "div_min_cont_pass_pct"),
+        "assessment_notes": _txt(root, "div_assessment_supp"),
     }
-    pdf_url_el = soup.select_one("#pdf_url")
-    pdf_relative = pdf_url_el.get_text(strip=True) if pdf_url_el else None
+    pdf_url_el = root.get_element_by_id("pdf_url", None)
+    pdf_relative = pdf_url_el.text_content().strip() if pdf_url_el is not None else None
     pdf_url = None
     if pdf_relative and pdf_relative.lower().endswith('.pdf'):
-        a_parent = pdf_url_el.find_parent('a')
-        if a_parent and a_parent.get('href'):
+        a_parent = next(pdf_url_el.iterancestors("a"), None)
+        if a_parent is not None and a_parent.get('href'):
             pdf_url = a_parent.get('href')
     return {
         "course_code": code,
@@ -78,6 +119,87 @@ def parse_course_page(code: str, url: str, html: str) -> Dict[str, Any]:
     }
 
 
+def _parse_course_safe(code: str, url: str, html: str) -> Dict[str, Any]:
+    """parse_course_page that reports failures as an error record (runs in worker processes)."""
+    try:
+        return parse_course_page(code, url, html)
+    except Exception as e:
+        return {"course_code": code, "url": url, "error": str(e)}
+
+
+def course_parse_pool(workers: Optional[int] = None):
+    """Process pool for CPU-bound course parsing; a no-op context for workers <= 1.
+    
+    Create it once per scrape run and pass it to every parse_major_page call.
+    Workers are spawned, not forked, because the pool is first used while
+    fetch threads and the shared HTTP client are running.
+    
+    Args:
+        workers: number of parse processes (default: os.cpu_count())
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1:
+        return nullcontext(None)
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+def _event_loop_running() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+async def _fetch_courses_async(
+    code_list: List[str],
+    base_course_url: str,
+    *,
+    concurrency: int,
+    delay: float,
+    timeout: float,
+    retries: int,
+    verbose: bool,
+    cache_dir: Optional[str],
+    revalidate: bool = False,
+    host_qps: float = 0.0,
+    parse_pool: Optional[ProcessPoolExecutor] = None,
+) -> List[Dict[str, Any]]:
+    """Fetch and parse course pages on one event loop with at most `concurrency` requests in flight.
+
+    Parsing is offloaded to `parse_pool` when given, otherwise done inline after each fetch.
+    """
+    loop = asyncio.get_running_loop()
+    sem = asyncio.Semaphore(concurrency)
+    connector = aiohttp.TCPConnector(limit=concurrency, limit_per_host=concurrency)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+
+        async def fetch_one(code: str) -> Dict[str, Any]:
+            course_url = f"{base_course_url}{code}.htm"
+            try:
+                async with sem:
+                    html_c = await fetch_cached_async(
+                        cache_dir, course_url, session=session, revalidate=revalidate, retries=retries, delay=delay, host_qps=host_qps
+                    )
+            except Exception as e:
+                return {"course_code": code, "url": course_url, "error": str(e)}
+            if parse_pool is None:
+                return _parse_course_safe(code, course_url, html_c)
+            try:
+                return await loop.run_in_executor(parse_pool, _parse_course_safe, code, course_url, html_c)
+            except Exception as e:
+                return {"course_code": code, "url": course_url, "error": str(e)}
+
+        courses: List[Dict[str, Any]] = []
+        for fut in asyncio.as_completed([fetch_one(code) for code in code_list]):
+            courses.append(await fut)
+            done = len(courses)
+            if verbose and (done % 5 == 0 or done == len(code_list)):
+                print(f"    progress: {done}/{len(code_list)}")
+    return courses
+
+
 def parse_major_page(
     url: str,
     html: str,
@@ -90,7 +212,18 @@ def parse_major_page(
     verbose: bool = False,
     concurrency: int = 1,
     cache_dir: Optional[str] = None,
+    revalidate: bool = False,
+    host_qps: float = 0.0,
+    parse_pool: Optional[ProcessPoolExecutor] = None,
+    parse_workers: Optional[int] = None,
 ) -> MajorPage:
+    """Parse a major curriculum page, optionally fetching its course pages.
+    
+    Each fetch worker pauses `delay` seconds after a request; host_qps > 0 also
+    caps the total request rate to the course host (see core.scraper.http).
+    Course pages are parsed in `parse_pool` when given (see course_parse_pool);
+    otherwise a pool of up to `parse_workers` processes is started for this call.
+    """
     soup = BeautifulSoup(html, "lxml")
 
     header_title = soup.select_one("#div_prog_title_header")
@@ -115,10 +248,15 @@ def parse_major_page(
     content_root = soup.select_one("#cityu-content") or soup
     tables = content_root.find_all("table", attrs={"border": True})
 
+    # Flat document-order list of tags, built once; walking it backwards from a
+    # table gives the same elements as find_all_previous() without re-scanning
+    # the tree for every table.
+    all_elements = [el for el in soup.descendants if isinstance(el, Tag)]
+    pos = {id(el): i for i, el in enumerate(all_elements)}
+
     def infer_caption(tbl) -> Optional[str]:
-        for prev in tbl.find_all_previous(limit=25):
-            if prev is tbl:
-                continue
+        start = pos[id(tbl)]
+        for prev in reversed(all_elements[max(start - 25, 0):start]):
             if prev.name == "table":
                 return None
             txt = normalize_space(prev.get_text(" ")) if prev.get_text(strip=True) else ""
@@ -127,13 +265,13 @@ def parse_major_page(
             if len(txt) > 300:
                 continue
             classes = " ".join(prev.get("class", []))
-            if any(key in classes for key in ["formText", "colorTitle", "formTitle"]) or prev.name in ["strong", "p", "div"]:
+            if _CAPTION_CLASS_RE.search(classes) or prev.name in ("strong", "p", "div"):
                 return txt[:120]
         return None
 
     for tbl in tables:
         tbl_text = tbl.get_text(" ")
-        if not re.search(r"Course Code|Credit Units|GE|SDSC", tbl_text, re.I):
+        if not _TABLE_KEYWORDS_RE.search(tbl_text):
             continue
         caption = infer_caption(tbl)
         headers: List[str] = []
@@ -182,55 +320,83 @@ def parse_major_page(
                         codes.add(m.group(1))
         base_course_url = "https://www.cityu.edu.hk/catalogue/ug/current/course/"
 
-        # Fetch function (separate session per thread for safety)
-        def fetch_one(code: str) -> Dict[str, Any]:
+        # Shared keep-alive pool (core.net), also used for the major page itself
+        course_session = session if session is not None else get_session(max(1, concurrency))
+
+        def fetch_only(code: str) -> Tuple[str, str, str]:
             course_url = f"{base_course_url}{code}.htm"
-            key = course_url.replace("https://", "").replace("http://", "").replace("/", "_")
-            try:
-                # Try cache first when available
-                html_c: Optional[str] = None
-                if cache_dir:
-                    try:
-                        path = os.path.join(cache_dir, key + ".html")
-                        if os.path.isfile(path):
-                            with open(path, "r", encoding="utf-8") as f:
-                                html_c = f.read()
-                    except Exception:
-                        html_c = None
-                if html_c is None:
-                    html_c = fetch_html(course_url, session=None, delay=delay, timeout=timeout, retries=retries)
-                    if cache_dir:
-                        try:
-                            os.makedirs(cache_dir, exist_ok=True)
-                            with open(os.path.join(cache_dir, key + ".html"), "w", encoding="utf-8") as f:
-                                f.write(html_c)
-                        except Exception:
-                            pass
-                info = parse_course_page(code, course_url, html_c)
-                return info
-            except Exception as e:
-                return {"course_code": code, "url": course_url, "error": str(e)}
+            # Try cache first when available
+            html_c = fetch_cached(
+                cache_dir, course_url, revalidate=revalidate,
+                session=course_session, delay=delay, host_qps=host_qps, timeout=timeout, retries=retries,
+            )
+            return code, course_url, html_c
+
+        def fetch_error(code: str, e: Exception) -> Dict[str, Any]:
+            return {"course_code": code, "url": f"{base_course_url}{code}.htm", "error": str(e)}
 
         code_list = sorted(codes)
+        if parse_pool is not None or concurrency <= 1:
+            pool_ctx = nullcontext(parse_pool)
+        else:
+            pool_ctx = course_parse_pool(min(parse_workers or os.cpu_count() or 1, len(code_list)))
         if concurrency <= 1:
             # Serial
             for idx, code in enumerate(code_list, 1):
                 if verbose:
                     print(f"  [courses] {idx}/{len(code_list)} {code}")
-                courses.append(fetch_one(code))
+                try:
+                    courses.append(_parse_course_safe(*fetch_only(code)))
+                except Exception as e:
+                    courses.append(fetch_error(code, e))
+        elif aiohttp is not None and not HAS_HTTPX and not _event_loop_running():
+            # Concurrent on a single event loop, parsing in worker processes
+            # (aiohttp is HTTP/1.1 only, so httpx's HTTP/2 path below wins when installed)
+            if verbose:
+                print(f"  [courses] fetching {len(code_list)} courses with {concurrency} async requests...")
+            with pool_ctx as parse_pool:
+                courses = asyncio.run(_fetch_courses_async(
+                    code_list,
+                    base_course_url,
+                    concurrency=concurrency,
+                    delay=delay,
+                    timeout=timeout,
+                    retries=retries,
+                    verbose=verbose,
+                    cache_dir=cache_dir,
+                    revalidate=revalidate,
+                    host_qps=host_qps,
+                    parse_pool=parse_pool,
+                ))
         else:
-            # Concurrent
+            # Concurrent fetches in threads (over one HTTP/2 connection with httpx,
+            # or the fallback when aiohttp is unavailable), parsing in worker
+            # processes as pages arrive
             if verbose:
                 print(f"  [courses] fetching {len(code_list)} courses with {concurrency} workers...")
-            with ThreadPoolExecutor(max_workers=max(1, concurrency)) as ex:
-                future_map = {ex.submit(fetch_one, code): code for code in code_list}
+            with ThreadPoolExecutor(max_workers=max(1, concurrency)) as ex, pool_ctx as parse_pool:
+                future_map = {ex.submit(fetch_only, code): code for code in code_list}
+                parse_futs = []
                 done = 0
                 for fut in as_completed(future_map):
-                    res = fut.result()
-                    courses.append(res)
                     done += 1
                     if verbose and (done % 5 == 0 or done == len(code_list)):
                         print(f"    progress: {done}/{len(code_list)}")
+                    code = future_map[fut]
+                    try:
+                        page = fut.result()
+                    except Exception as e:
+                        courses.append(fetch_error(code, e))
+                        continue
+                    if parse_pool is None:
+                        courses.append(_parse_course_safe(*page))
+                    else:
+                        parse_futs.append((code, parse_pool.submit(_parse_course_safe, *page)))
+                for code, pfut in parse_futs:
+                    try:
+                        courses.append(pfut.result())
+                    except Exception as e:
+                        courses.append(fetch_error(code, e))
 
     return MajorPage(
         url=url,
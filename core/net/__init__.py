@@ -0,0 +1,5 @@
+"""Shared networking helpers (HTTP connection pool)."""
+
+from .pool import HAS_HTTPX, get_session, close_session
+
+__all__ = ["HAS_HTTPX", "get_session", "close_session"]
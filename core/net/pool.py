@@ -0,0 +1,80 @@
+"""Process-wide HTTP connection pool shared by the scraping stages.
+
+scrape-major / build-db / run-all all talk to www.cityu.edu.hk; reusing one
+client keeps TCP+TLS connections alive from the major page fetch through
+every course page fetch instead of re-handshaking per stage.
+
+Functions:
+    get_session(pool_size: int = 16) -> httpx.Client | requests.Session
+    close_session() -> None
+
+Constants:
+    HAS_HTTPX: True when httpx with HTTP/2 support (h2) is installed
+"""
+from __future__ import annotations
+
+import atexit
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:  # optional: HTTP/2 client (pip install "httpx[http2]")
+    import httpx  # type: ignore
+    import h2  # type: ignore  # noqa: F401  (required by httpx for http2=True)
+except ImportError:  # pragma: no cover
+    httpx = None  # type: ignore
+
+# Whether the HTTP/2 client is usable; other modules branch on this instead of probing again
+HAS_HTTPX = httpx is not None
+
+# Lower bounds for the pool; a larger pool_size on first use raises them
+POOL_MAXSIZE = 64
+POOL_PER_HOST = 16
+
+_lock = threading.Lock()
+_session = None
+
+
+def _new_session(pool_size: int):
+    """HTTP/2 httpx.Client when available (concurrent requests multiplexed over
+    one connection), else a requests.Session with a pooled HTTPAdapter."""
+    per_host = max(POOL_PER_HOST, pool_size)
+    if HAS_HTTPX:
+        return httpx.Client(
+            http2=True,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=max(POOL_MAXSIZE, per_host), max_keepalive_connections=per_host),
+            # Same fallback as requests for text/html without a charset
+            default_encoding="ISO-8859-1",
+        )
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=POOL_PER_HOST, pool_maxsize=per_host, max_retries=0)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_session(pool_size: int = POOL_PER_HOST):
+    """Return the shared HTTP client, creating it on first use.
+
+    pool_size (usually the fetch concurrency) only matters for the first call.
+    """
+    global _session
+    with _lock:
+        if _session is None:
+            _session = _new_session(pool_size)
+        return _session
+
+
+@atexit.register
+def close_session() -> None:
+    """Close the shared client; the next get_session() opens a new one."""
+    global _session
+    with _lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+__all__ = ["get_session", "close_session"]
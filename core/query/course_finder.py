@@ -6,8 +6,63 @@ This module provides functions to query the course database and find:
 - Root courses (no prerequisites required)
 """
 
+import atexit
+import json
+import os
 import sqlite3
-from typing import List, Dict, Tuple
+from itertools import groupby
+from typing import List, Dict
+
+from core.dp_build.models import SCHEMA_VERSION, SEMESTER_A, SEMESTER_B, SEMESTER_MASKS
+
+# courses.semester is a bitmask (A=1, B=2, A+B=3)
+SEMESTER_BITS = {'A': SEMESTER_A, 'B': SEMESTER_B}
+
+# One query-only connection per database file, reused across queries
+_conn_cache: Dict[str, sqlite3.Connection] = {}
+# Databases built before the semester bitmask (still holding 'A' / 'B' labels)
+_legacy_semester: Dict[str, bool] = {}
+
+# Completed courses are passed in as a JSON array, so queries need no temp table
+_COMPLETED_CTE = "WITH completed(code) AS (SELECT value FROM json_each(:completed)) "
+
+
+def _get_conn(db_path: str) -> sqlite3.Connection:
+    """Return the cached query-only connection for db_path, opening it on first use."""
+    key = os.path.abspath(db_path)
+    conn = _conn_cache.get(key)
+    if conn is None:
+        conn = sqlite3.connect(key)
+        conn.execute("PRAGMA query_only=1")
+        conn.execute("PRAGMA cache_size=-20000")
+        # Read pages straight from the OS page cache (needs a local filesystem)
+        conn.execute("PRAGMA mmap_size=268435456")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        _legacy_semester[key] = _has_semester_labels(conn)
+        _conn_cache[key] = conn
+    return conn
+
+
+def _has_semester_labels(conn: sqlite3.Connection) -> bool:
+    """True for a DB written before SCHEMA_VERSION 1 that still stores 'A' / 'B' labels."""
+    if conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+        return False
+    try:
+        row = conn.execute(
+            "SELECT 1 FROM courses WHERE semester IN (SELECT value FROM json_each(?)) LIMIT 1",
+            (json.dumps(list(SEMESTER_MASKS)),),
+        ).fetchone()
+    except sqlite3.OperationalError:  # no courses table yet
+        return False
+    return row is not None
+
+
+@atexit.register
+def _close_conns() -> None:
+    for conn in _conn_cache.values():
+        conn.close()
+    _conn_cache.clear()
+    _legacy_semester.clear()
 
 
 def find_available_courses(db_path: str, completed_courses: List[str], semester_filter: str = None) -> Dict[str, list]:
@@ -29,64 +84,70 @@ def find_available_courses(db_path: str, completed_courses: List[str], semester_
         >>> print(results['available'])
         [('SDSC2003', 'Human Contexts and Ethics in Data Science')]
     """
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
+    cursor = _get_conn(db_path).cursor()
     
     # Normalize completed courses to uppercase
     completed = set(c.strip().upper() for c in completed_courses)
+    params: Dict[str, object] = {'completed': json.dumps(sorted(completed))}
+    
+    # Candidate courses: not completed, optionally filtered by semester
+    where = "c.course_code NOT IN (SELECT code FROM completed)"
+    semester_bit = SEMESTER_BITS.get(semester_filter.upper()) if semester_filter else None
+    if semester_bit:
+        if _legacy_semester[os.path.abspath(db_path)]:
+            raise ValueError(
+                f"{db_path} was built by an older version (text semesters); "
+                "run build-db on it again to filter by semester"
+            )
+        where += " AND (c.semester & :semester) != 0"
+        params['semester'] = semester_bit
+    
+    # Available courses: has prerequisites and every one of them is completed
+    cursor.execute(
+        _COMPLETED_CTE +
+        "SELECT c.course_code, c.course_title FROM courses c "
+        f"WHERE {where} "
+        "AND EXISTS (SELECT 1 FROM prerequisites p WHERE p.course_code = c.course_code) "
+        "AND NOT EXISTS (SELECT 1 FROM prerequisites p WHERE p.course_code = c.course_code "
+        "AND p.prereq_code NOT IN (SELECT code FROM completed)) "
+        "ORDER BY c.course_code",
+        params
+    )
+    available = cursor.fetchall()
+    
+    # Root courses (no prerequisites)
+    cursor.execute(
+        _COMPLETED_CTE +
+        "SELECT c.course_code, c.course_title FROM courses c "
+        f"WHERE {where} "
+        "AND NOT EXISTS (SELECT 1 FROM prerequisites p WHERE p.course_code = c.course_code) "
+        "ORDER BY c.course_code",
+        params
+    )
+    no_prereq = cursor.fetchall()
     
-    # Get all courses, optionally filtered by semester
-    if semester_filter and semester_filter.upper() in ['A', 'B']:
-        cursor.execute("SELECT course_code, course_title, semester FROM courses WHERE semester LIKE ?", 
-                      (f'%{semester_filter.upper()}%',))
-    else:
-        cursor.execute("SELECT course_code, course_title, semester FROM courses")
-    
-    all_courses = {row[0]: row[1] for row in cursor.fetchall()}
-    
-    # Get all prerequisite relationships
-    cursor.execute("SELECT course_code, prereq_code FROM prerequisites")
-    prereqs = {}
-    for course, prereq in cursor.fetchall():
-        if course not in prereqs:
-            prereqs[course] = []
-        prereqs[course].append(prereq)
-    
-    # Find root courses (no prerequisites)
-    no_prereq = []
-    for course in all_courses:
-        if course not in prereqs and course not in completed:
-            no_prereq.append((course, all_courses[course]))
-    
-    # Find available courses (all prerequisites met)
-    available = []
-    for course in all_courses:
-        if course in completed:
-            continue
-        if course in prereqs:
-            # Check if all prerequisites are in completed
-            if all(p in completed for p in prereqs[course]):
-                available.append((course, all_courses[course]))
-        else:
-            # No prerequisites, already in no_prereq
-            pass
-    
-    # Find children of completed courses (courses that have completed courses as prerequisites)
-    completed_children = []
-    for course in all_courses:
-        if course in completed:
-            continue
-        if course in prereqs:
-            # Check if any prerequisite is in completed (direct children)
-            if any(p in completed for p in prereqs[course]):
-                completed_children.append((course, all_courses[course], prereqs[course]))
-    
-    conn.close()
+    # Children of completed courses (at least one prerequisite completed),
+    # together with their full prerequisite list. group_concat() has no defined
+    # order, so rows come back in insertion (rowid) order and are grouped here.
+    cursor.execute(
+        _COMPLETED_CTE +
+        "SELECT c.course_code, c.course_title, p.prereq_code FROM courses c "
+        "JOIN prerequisites p ON p.course_code = c.course_code "
+        f"WHERE {where} "
+        "AND EXISTS (SELECT 1 FROM prerequisites q WHERE q.course_code = c.course_code "
+        "AND q.prereq_code IN (SELECT code FROM completed)) "
+        "ORDER BY c.course_code, p.rowid",
+        params
+    )
+    completed_children = [
+        (code, title, [row[2] for row in rows])
+        for (code, title), rows in groupby(cursor.fetchall(), key=lambda row: row[:2])
+    ]
     
     return {
-        'available': sorted(available),
-        'no_prereq': sorted(no_prereq),
-        'completed_children': sorted(completed_children, key=lambda x: x[0])
+        'available': available,
+        'no_prereq': no_prereq,
+        'completed_children': completed_children,
     }
 
 
@@ -100,8 +161,7 @@ def get_course_info(db_path: str, course_code: str) -> Dict[str, any]:
     Returns:
         Dictionary with course information or None if not found
     """
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
+    cursor = _get_conn(db_path).cursor()
     
     course_code = course_code.strip().upper()
     
@@ -112,7 +172,6 @@ def get_course_info(db_path: str, course_code: str) -> Dict[str, any]:
     row = cursor.fetchone()
     
     if not row:
-        conn.close()
         return None
     
     # Get prerequisites
@@ -123,8 +182,6 @@ def get_course_info(db_path: str, course_code: str) -> Dict[str, any]:
     cursor.execute("SELECT excluded_code FROM exclusions WHERE course_code = ?", (course_code,))
     exclusions = [r[0] for r in cursor.fetchall()]
     
-    conn.close()
-    
     return {
         'code': row[0],
         'title': row[1],
@@ -149,12 +206,9 @@ def get_special_requirements(db_path: str) -> Dict[str, str]:
         >>> print(reqs.get('CS3001'))
         'Instructor's approval required'
     """
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
+    cursor = _get_conn(db_path).cursor()
     
     cursor.execute("SELECT course_code, requirement_text FROM special_requirements")
     requirements = {row[0]: row[1] for row in cursor.fetchall()}
     
-    conn.close()
-    
     return requirements
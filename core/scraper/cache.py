@@ -1,6 +1,26 @@
-"""HTML caching utilities for scraper."""
+"""HTML caching utilities for scraper.
+
+Pages are stored gzip-compressed under a short content address of the URL:
+``<cache_dir>/<hh>/<blake2b(url)>.html.gz`` where ``hh`` is the first two hex
+characters of the hash (keeps directories small). The response's ETag /
+Last-Modified validators are kept next to it in ``<blake2b(url)>.etag`` so a
+cached page can be revalidated with a conditional request.
+"""
+import gzip
+import hashlib
+import json
 import os
-from typing import Optional
+from typing import Dict, Optional
+
+import requests
+
+from core.scraper.http import fetch_page, fetch_page_async
+
+
+def cache_path(cache_dir: str, url: str) -> str:
+    """Return the cache file path for a URL."""
+    key = hashlib.blake2b(url.encode("utf-8"), digest_size=12).hexdigest()
+    return os.path.join(cache_dir, key[:2], key + ".html.gz")
 
 
 def maybe_read_cache(cache_dir: Optional[str], url: str) -> Optional[str]:
@@ -15,12 +35,10 @@ def maybe_read_cache(cache_dir: Optional[str], url: str) -> Optional[str]:
     """
     if not cache_dir:
         return None
-    os.makedirs(cache_dir, exist_ok=True)
-    key = url.replace("https://", "").replace("http://", "").replace("/", "_")
-    path = os.path.join(cache_dir, key + ".html")
+    path = cache_path(cache_dir, url)
     if os.path.isfile(path):
         try:
-            with open(path, "r", encoding="utf-8") as f:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
                 return f.read()
         except Exception:
             return None
@@ -37,11 +55,100 @@ def write_cache(cache_dir: Optional[str], url: str, html: str) -> None:
     """
     if not cache_dir:
         return
-    os.makedirs(cache_dir, exist_ok=True)
-    key = url.replace("https://", "").replace("http://", "").replace("/", "_")
-    path = os.path.join(cache_dir, key + ".html")
+    path = cache_path(cache_dir, url)
     try:
-        with open(path, "w", encoding="utf-8") as f:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with gzip.open(path, "wt", encoding="utf-8", compresslevel=6) as f:
             f.write(html)
     except Exception:
         pass
+
+
+def _validators_path(cache_dir: str, url: str) -> str:
+    return cache_path(cache_dir, url)[:-len(".html.gz")] + ".etag"
+
+
+def read_validators(cache_dir: Optional[str], url: str) -> Dict[str, str]:
+    """Read stored ETag / Last-Modified validators for a cached URL (empty if none)."""
+    if not cache_dir:
+        return {}
+    try:
+        with open(_validators_path(cache_dir, url), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except Exception:
+        return {}
+
+
+def write_validators(cache_dir: Optional[str], url: str, validators: Dict[str, str]) -> None:
+    """Store ETag / Last-Modified validators for a cached URL.
+
+    Empty validators (a 200 without ETag / Last-Modified) delete the stored
+    ones, so later revalidations don't send validators for an older body.
+    """
+    if not cache_dir:
+        return
+    path = _validators_path(cache_dir, url)
+    if not validators:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        return
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(validators, f)
+    except Exception:
+        pass
+
+
+def fetch_cached(
+    cache_dir: Optional[str],
+    url: str,
+    *,
+    revalidate: bool = False,
+    timeout: float = 15.0,
+    retries: int = 3,
+    delay: float = 0.0,
+    host_qps: float = 0.0,
+    session: Optional[requests.Session] = None,
+) -> str:
+    """Return HTML for a URL from cache, fetching (and caching) it when missing.
+
+    With revalidate=True a cached page is checked with a conditional request
+    using its stored validators; a 304 response keeps the cached copy.
+    """
+    html = maybe_read_cache(cache_dir, url)
+    if html is not None and not revalidate:
+        return html
+    validators = read_validators(cache_dir, url) if html is not None else {}
+    fresh, validators = fetch_page(url, validators=validators, timeout=timeout, retries=retries, delay=delay, host_qps=host_qps, session=session)
+    if fresh is not None:
+        html = fresh
+        write_cache(cache_dir, url, html)
+    write_validators(cache_dir, url, validators)
+    return html  # type: ignore
+
+
+async def fetch_cached_async(
+    cache_dir: Optional[str],
+    url: str,
+    *,
+    session,
+    revalidate: bool = False,
+    retries: int = 3,
+    delay: float = 0.0,
+    host_qps: float = 0.0,
+) -> str:
+    """Async counterpart of fetch_cached using an aiohttp.ClientSession."""
+    html = maybe_read_cache(cache_dir, url)
+    if html is not None and not revalidate:
+        return html
+    validators = read_validators(cache_dir, url) if html is not None else {}
+    fresh, validators = await fetch_page_async(url, session=session, validators=validators, retries=retries, delay=delay, host_qps=host_qps)
+    if fresh is not None:
+        html = fresh
+        write_cache(cache_dir, url, html)
+    write_validators(cache_dir, url, validators)
+    return html  # type: ignore
@@ -1,5 +1,8 @@
+import asyncio
+import threading
 import time
-from typing import Optional
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
 import requests
 
 DEFAULT_HEADERS = {
@@ -7,16 +10,84 @@ DEFAULT_HEADERS = {
     "Accept-Language": "en-US,en;q=0.9,zh-CN;q=0.8,zh;q=0.7",
 }
 
-def fetch_html(url: str, *, timeout: float = 15.0, retries: int = 3, delay: float = 0.0, session: Optional[requests.Session] = None) -> str:
+# Optional per-host rate limit (host_qps): next time slot at which a request to
+# each host may start. Shared by all threads so the total request rate per host
+# stays bounded however many requests are in flight. `delay` stays a pause per worker.
+_host_lock = threading.Lock()
+_host_next_slot: Dict[str, float] = {}
+
+
+def _reserve_host_slot(url: str, host_qps: float) -> float:
+    """Reserve the next request slot for the URL's host; returns seconds to wait."""
+    if not host_qps or host_qps <= 0:
+        return 0.0
+    host = urlsplit(url).hostname or ""
+    with _host_lock:
+        now = time.monotonic()
+        slot = max(now, _host_next_slot.get(host, now))
+        _host_next_slot[host] = slot + 1.0 / host_qps
+    return slot - now
+
+
+def _wait_for_host_slot(url: str, host_qps: float) -> None:
+    wait = _reserve_host_slot(url, host_qps)
+    if wait > 0:
+        time.sleep(wait)
+
+
+def _request_headers(validators: Optional[Dict[str, str]]) -> Dict[str, str]:
+    """DEFAULT_HEADERS plus conditional-request headers for the given cache validators."""
+    headers = dict(DEFAULT_HEADERS)
+    if validators:
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+    return headers
+
+
+def _response_validators(resp_headers) -> Dict[str, str]:
+    validators = {}
+    if resp_headers.get("ETag"):
+        validators["etag"] = resp_headers["ETag"]
+    if resp_headers.get("Last-Modified"):
+        validators["last_modified"] = resp_headers["Last-Modified"]
+    return validators
+
+
+def fetch_page(
+    url: str,
+    *,
+    validators: Optional[Dict[str, str]] = None,
+    timeout: float = 15.0,
+    retries: int = 3,
+    delay: float = 0.0,
+    host_qps: float = 0.0,
+    session: Optional[requests.Session] = None,
+) -> Tuple[Optional[str], Dict[str, str]]:
+    """GET a page, optionally as a conditional request.
+
+    Returns (html, validators). html is None when the server answered
+    304 Not Modified for the given validators (ETag / Last-Modified).
+    session may be a requests.Session or an httpx.Client.
+    The calling worker pauses `delay` seconds after each response; host_qps > 0
+    additionally caps requests per second to the URL's host across all workers.
+    """
     sess = session or requests.Session()
+    headers = _request_headers(validators)
     last_exc = None
     for attempt in range(1, retries + 1):
         try:
-            resp = sess.get(url, headers=DEFAULT_HEADERS, timeout=timeout)
-            resp.raise_for_status()
+            _wait_for_host_slot(url, host_qps)
+            resp = sess.get(url, headers=headers, timeout=timeout)
+            if resp.status_code == 304:
+                result = None, _response_validators(resp.headers) or dict(validators or {})
+            else:
+                resp.raise_for_status()
+                result = resp.text, _response_validators(resp.headers)
             if delay:
                 time.sleep(delay)
-            return resp.text
+            return result
         except Exception as e:
             last_exc = e
             if attempt < retries:
@@ -24,3 +95,46 @@ def fetch_html(url: str, *, timeout: float = 15.0, retries: int = 3, delay: floa
             else:
                 raise
     raise last_exc  # type: ignore
+
+
+def fetch_html(url: str, *, timeout: float = 15.0, retries: int = 3, delay: float = 0.0, host_qps: float = 0.0, session: Optional[requests.Session] = None) -> str:
+    html, _ = fetch_page(url, timeout=timeout, retries=retries, delay=delay, host_qps=host_qps, session=session)
+    return html  # type: ignore
+
+
+async def fetch_page_async(
+    url: str,
+    *,
+    session,
+    validators: Optional[Dict[str, str]] = None,
+    retries: int = 3,
+    delay: float = 0.0,
+    host_qps: float = 0.0,
+) -> Tuple[Optional[str], Dict[str, str]]:
+    """Async counterpart of fetch_page using an aiohttp.ClientSession.
+
+    The request timeout is taken from the session (aiohttp.ClientTimeout).
+    """
+    headers = _request_headers(validators)
+    for attempt in range(1, retries + 1):
+        try:
+            wait = _reserve_host_slot(url, host_qps)
+            if wait > 0:
+                await asyncio.sleep(wait)
+            async with session.get(url, headers=headers) as resp:
+                if resp.status == 304:
+                    result = None, _response_validators(resp.headers) or dict(validators or {})
+                else:
+                    resp.raise_for_status()
+                    body = await resp.read()
+                    # Same fallback as requests for text/html without a charset
+                    result = body.decode(resp.charset or "ISO-8859-1", errors="replace"), _response_validators(resp.headers)
+            if delay:
+                await asyncio.sleep(delay)
+            return result
+        except Exception:
+            if attempt < retries:
+                await asyncio.sleep(min(1.0 * attempt, 3.0))
+            else:
+                raise
+    raise RuntimeError(f"failed to fetch {url}")  # pragma: no cover
@@ -1,17 +1,89 @@
 """Scraping orchestration for major pages."""
+import asyncio
 import os
 import sys
-from typing import List, Optional
+from contextlib import nullcontext
+from typing import Iterator, List, Optional, Tuple, Union
 
-import requests
+try:  # optional: fetch several major pages concurrently
+    import aiohttp  # type: ignore
+except ImportError:  # pragma: no cover
+    aiohttp = None  # type: ignore
 
-from core.scraper.http import fetch_html
-from core.scraper.cache import maybe_read_cache, write_cache
-from core.dp_build.parsers import parse_major_page
+from core.net.pool import get_session
+from core.scraper.cache import fetch_cached, fetch_cached_async
+from core.dp_build.parsers import _event_loop_running, course_parse_pool, parse_major_page
 from core.dp_build.models import MajorPage
 
+# Major pages prefetched per event-loop run; bounds the HTML held before it is parsed
+_PREFETCH_WINDOW = 8
 
-def scrape_major_pages(
+
+async def _fetch_majors_async(
+    urls: List[str],
+    *,
+    concurrency: int,
+    timeout: float,
+    retries: int,
+    delay: float,
+    cache_dir: Optional[str],
+    revalidate: bool,
+    host_qps: float,
+) -> list:
+    """Fetch all major pages on one event loop; failures are returned in place as exceptions."""
+    sem = asyncio.Semaphore(concurrency)
+    connector = aiohttp.TCPConnector(limit=concurrency, keepalive_timeout=30)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+
+        async def fetch_one(u: str) -> str:
+            async with sem:
+                return await fetch_cached_async(
+                    cache_dir, u, session=session, revalidate=revalidate, retries=retries, delay=delay, host_qps=host_qps
+                )
+
+        return await asyncio.gather(*(fetch_one(u) for u in urls), return_exceptions=True)
+
+
+def _iter_major_html(
+    urls: List[str],
+    *,
+    concurrency: int,
+    timeout: float,
+    retries: int,
+    delay: float,
+    cache_dir: Optional[str],
+    revalidate: bool,
+    host_qps: float,
+    session,
+) -> Iterator[Tuple[str, Union[str, BaseException]]]:
+    """(url, html) pairs in URL order; a failed fetch gives its exception instead of html.
+    
+    With aiohttp and several URLs, pages are fetched _PREFETCH_WINDOW at a time
+    on one event loop. Inside a running loop (asyncio.run() is not allowed
+    there) or for a single URL, they are fetched one by one.
+    """
+    if aiohttp is None or len(urls) < 2 or _event_loop_running():
+        for u in urls:
+            try:
+                yield u, fetch_cached(cache_dir, u, revalidate=revalidate, timeout=timeout, retries=retries, delay=delay, host_qps=host_qps, session=session)
+            except Exception as e:
+                yield u, e
+        return
+    for start in range(0, len(urls), _PREFETCH_WINDOW):
+        window = urls[start:start + _PREFETCH_WINDOW]
+        yield from zip(window, asyncio.run(_fetch_majors_async(
+            window,
+            concurrency=max(1, concurrency),
+            timeout=timeout,
+            retries=retries,
+            delay=delay,
+            cache_dir=cache_dir,
+            revalidate=revalidate,
+            host_qps=host_qps,
+        )))
+
+
+def iter_major_pages(
     urls: List[str],
     *,
     delay: float = 0.0,
@@ -20,53 +92,87 @@ def scrape_major_pages(
     verbose: bool = False,
     include_courses: bool = False,
     concurrency: int = 1,
-    cache_dir: Optional[str] = None
-) -> List[MajorPage]:
-    """Scrape one or more major curriculum pages.
+    cache_dir: Optional[str] = None,
+    revalidate: bool = False,
+    host_qps: float = 0.0,
+    session=None,
+    parse_workers: Optional[int] = None
+) -> Iterator[MajorPage]:
+    """Scrape one or more major curriculum pages, yielding each as it is parsed.
     
     Args:
         urls: list of major page URLs to scrape
-        delay: delay between requests
+        delay: pause after each request, per worker
         timeout: request timeout
         retries: number of retries for failed requests
         verbose: print progress messages
         include_courses: also fetch course detail pages
         concurrency: number of concurrent workers for course fetching
         cache_dir: directory for HTML cache
+        revalidate: re-check cached pages with conditional requests (ETag / Last-Modified)
+        host_qps: cap on requests per second to each host across all workers (0 = no cap)
+        session: HTTP client to reuse (default: the shared pool from core.net)
+        parse_workers: processes for parsing course pages (default: os.cpu_count(); 1 parses inline)
         
-    Returns:
-        List of MajorPage objects
+    Yields:
+        MajorPage objects, in URL order (failed URLs are reported and skipped)
     """
-    session = requests.Session()
-    results: List[MajorPage] = []
+    if session is None:
+        session = get_session(max(1, concurrency))
     
-    for i, u in enumerate(urls, 1):
-        if verbose:
-            print(f"[{i}/{len(urls)}] Fetching {u}")
-        
-        try:
-            html = maybe_read_cache(cache_dir, u)
-            if html is None:
-                html = fetch_html(u, timeout=timeout, retries=retries, delay=delay, session=session)
-                write_cache(cache_dir, u, html)
+    # One course-parsing pool for every major in this run
+    with course_parse_pool(parse_workers) if include_courses else nullcontext(None) as parse_pool:
+        # Major pages come a window at a time (course pages are fetched per major inside parse_major_page)
+        pages = _iter_major_html(
+            urls,
+            concurrency=concurrency,
+            timeout=timeout,
+            retries=retries,
+            delay=delay,
+            cache_dir=cache_dir,
+            revalidate=revalidate,
+            host_qps=host_qps,
+            session=session,
+        )
+        for i, (u, html) in enumerate(pages, 1):
+            if verbose:
+                print(f"[{i}/{len(urls)}] Fetching {u}")
             
-            mp = parse_major_page(
-                u,
-                html,
-                include_courses=include_courses,
-                session=session,
-                delay=delay,
-                timeout=timeout,
-                retries=retries,
-                verbose=verbose,
-                concurrency=concurrency,
-                cache_dir=cache_dir,
-            )
-            results.append(mp)
+            try:
+                if isinstance(html, BaseException):
+                    raise html
+                
+                mp = parse_major_page(
+                    u,
+                    html,
+                    include_courses=include_courses,
+                    session=session,
+                    delay=delay,
+                    timeout=timeout,
+                    retries=retries,
+                    verbose=verbose,
+                    concurrency=concurrency,
+                    cache_dir=cache_dir,
+                    revalidate=revalidate,
+                    host_qps=host_qps,
+                    parse_pool=parse_pool,
+                    parse_workers=parse_workers,
+                )
+            except Exception as e:
+                print(f"Error {u}: {e}", file=sys.stderr)
+                continue
             
             if verbose:
                 print(f"  -> {mp.program_title or 'N/A'} tables={len(mp.structure_tables)} courses={len(mp.courses)}")
-        except Exception as e:
-            print(f"Error {u}: {e}", file=sys.stderr)
+            yield mp
+
+
+def scrape_major_pages(urls: List[str], **kwargs) -> List[MajorPage]:
+    """Scrape one or more major curriculum pages.
+    
+    Same keyword arguments as iter_major_pages.
     
-    return results
+    Returns:
+        List of MajorPage objects
+    """
+    return list(iter_major_pages(urls, **kwargs))
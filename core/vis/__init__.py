@@ -2,7 +2,7 @@
 
 # Re-export from new modular structure for backward compatibility
 from .common import load_relations, load_exclusions, build_graph
-from .dependency import render_dependency_tree
+from .dependency import render_dependency_tree, render_many
 from .roots import render_root_courses
 
 __all__ = [
@@ -10,5 +10,6 @@ __all__ = [
     "load_exclusions", 
     "build_graph",
     "render_dependency_tree",
+    "render_many",
     "render_root_courses",
 ]
@@ -7,7 +7,7 @@ from __future__ import annotations
 
 import os
 import sqlite3
-from typing import Dict, Set, Tuple, List
+from typing import Dict, Set, Tuple, List, Optional
 
 try:
     import networkx as nx  # type: ignore
@@ -15,16 +15,34 @@ except ImportError as e:  # pragma: no cover
     raise RuntimeError("networkx is required. Install: pip install networkx matplotlib") from e
 
 
-def load_relations(db_path: str) -> Tuple[Dict[str, Dict], List[Tuple[str, str]]]:
+def open_readonly(db_path: str) -> sqlite3.Connection:
+    """Open a query-only, memory-mapped connection for loading graph data.
+
+    Lets several loads (relations + exclusions) share one connection and
+    its page cache.
+    """
+    if not os.path.isfile(db_path):
+        raise FileNotFoundError(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA query_only=1")
+    conn.execute("PRAGMA mmap_size=268435456")
+    return conn
+
+
+def load_relations(db_path: str, conn: Optional[sqlite3.Connection] = None) -> Tuple[Dict[str, Dict], List[Tuple[str, str]]]:
     """Load courses and prerequisite pairs from SQLite.
 
+    If conn is given it is used (and left open) instead of opening db_path.
+
     Returns:
         courses: mapping code -> {title, offering_unit, credit_units}
         edges: list of (prereq -> course) pairs
     """
-    if not os.path.isfile(db_path):
-        raise FileNotFoundError(db_path)
-    conn = sqlite3.connect(db_path)
+    own = conn is None
+    if own:
+        if not os.path.isfile(db_path):
+            raise FileNotFoundError(db_path)
+        conn = sqlite3.connect(db_path)
     cur = conn.cursor()
     cur.execute("SELECT course_code, course_title, offering_unit, credit_units FROM courses")
     courses: Dict[str, Dict] = {}
@@ -32,20 +50,25 @@ def load_relations(db_path: str) -> Tuple[Dict[str, Dict], List[Tuple[str, str]]
         courses[code] = {"title": title, "unit": unit, "credits": cu}
     cur.execute("SELECT prereq_code, course_code FROM prerequisites")
     edges = [(pre, course) for pre, course in cur.fetchall() if pre in courses and course in courses]
-    conn.close()
+    if own:
+        conn.close()
     return courses, edges
 
 
-def load_exclusions(db_path: str) -> Dict[str, Set[str]]:
+def load_exclusions(db_path: str, conn: Optional[sqlite3.Connection] = None) -> Dict[str, Set[str]]:
     """Load course exclusions mapping from database.
     
+    If conn is given it is used (and left open) instead of opening db_path.
+    
     Returns:
         mapping: course_code -> set of excluded course codes
     """
     mapping: Dict[str, Set[str]] = {}
-    if not os.path.isfile(db_path):
-        return mapping
-    conn = sqlite3.connect(db_path)
+    own = conn is None
+    if own:
+        if not os.path.isfile(db_path):
+            return mapping
+        conn = sqlite3.connect(db_path)
     cur = conn.cursor()
     try:
         cur.execute("SELECT course_code, excluded_code FROM exclusions")
@@ -56,7 +79,8 @@ def load_exclusions(db_path: str) -> Dict[str, Set[str]]:
     except Exception:
         pass
     finally:
-        conn.close()
+        if own:
+            conn.close()
     return mapping
 
 
@@ -71,6 +95,7 @@ def build_graph(courses: Dict[str, Dict], edges: List[Tuple[str, str]]):
 
 
 __all__ = [
+    "open_readonly",
     "load_relations",
     "load_exclusions",
     "build_graph",
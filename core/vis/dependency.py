@@ -6,12 +6,18 @@ Supports cycle detection, focus mode, and layered layout.
 
 from __future__ import annotations
 
+import hashlib
+import json
+import multiprocessing
 import os
-from typing import Dict, Set, Tuple, List, Optional
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Set, Tuple, List, Optional
 
 try:
     import networkx as nx  # type: ignore
-    import matplotlib.pyplot as plt  # type: ignore
+    # Render on an Agg canvas directly; pyplot's figure registry is not needed
+    from matplotlib.figure import Figure  # type: ignore
+    from matplotlib.backends.backend_agg import FigureCanvasAgg  # type: ignore
     import matplotlib.cm as cm  # type: ignore
     import matplotlib.patches as mpatches  # type: ignore
     import numpy as np  # type: ignore
@@ -20,6 +26,19 @@ except ImportError as e:  # pragma: no cover
 
 from .common import load_relations, load_exclusions, build_graph
 
+# Longest side of raster output in pixels; large canvases get a lower dpi
+_MAX_IMAGE_PX = 6000
+
+# 多组高对比度的颜色池，按父节点循环使用
+_DISTINCT_COLORS = (
+    '#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd',  # tab10
+    '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22', '#17becf',
+    '#aec7e8', '#ffbb78', '#98df8a', '#ff9896', '#c5b0d5',  # tab20 浅色
+    '#c49c94', '#f7b6d2', '#c7c7c7', '#dbdb8d', '#9edae5',
+    '#393b79', '#637939', '#8c6d31', '#843c39', '#7b4173',  # tab20b
+    '#bd9e39', '#ad494a', '#a55194', '#6b6ecf', '#b5cf6b',
+)
+
 
 def remove_transitive_edges(g):
     """Remove transitive (redundant) edges from the graph.
@@ -33,19 +52,37 @@ def remove_transitive_edges(g):
         g: NetworkX directed graph
         
     Returns:
-        New graph with transitive edges removed
+        New graph with transitive edges removed (the input graph itself when
+        it is already minimal, i.e. a forest, or when it has cycles)
     """
-    # Use NetworkX's transitive_reduction
-    # This returns a new graph with the minimal set of edges
+    # Boolean-matrix reduction: an edge u → v is redundant when v is also
+    # reachable from one of u's successors (a path of length >= 2)
     try:
-        # transitive_reduction removes edges that can be inferred from other paths
-        reduced = nx.transitive_reduction(g)
+        # A forest has a single path between any two nodes, so nothing is redundant
+        if g.number_of_edges() <= g.number_of_nodes() - 1 and nx.is_forest(g.to_undirected(as_view=True)):
+            return g
+        
+        if not nx.is_directed_acyclic_graph(g):
+            raise nx.NetworkXError("transitive reduction requires a DAG")
+        
+        nodes = list(g.nodes)
+        adj = nx.to_numpy_array(g, nodelist=nodes, dtype=np.float32, weight=None)
+        
+        # Reachability closure by repeated squaring: reach |= reach @ reach
+        reach = adj > 0
+        while True:
+            r = reach.astype(np.float32)
+            closed = reach | ((r @ r) > 0)
+            if np.array_equal(closed, reach):
+                break
+            reach = closed
         
-        # Copy node attributes from original graph
-        for node in reduced.nodes():
-            if node in g.nodes:
-                reduced.nodes[node].update(g.nodes[node])
+        keep = (adj > 0) & ~((adj @ reach.astype(np.float32)) > 0)
         
+        # Rebuild the graph with the original node attributes
+        reduced = nx.DiGraph()
+        reduced.add_nodes_from(g.nodes(data=True))
+        reduced.add_edges_from((nodes[i], nodes[j]) for i, j in np.argwhere(keep))
         return reduced
     except Exception:
         # If reduction fails (e.g., cycles), return original graph
@@ -54,18 +91,49 @@ def remove_transitive_edges(g):
 
 def find_roots(g) -> List[str]:
     """Find courses with no prerequisites (in-degree == 0)."""
-    return [n for n in g.nodes if g.in_degree(n) == 0]
+    return [n for n, d in g.in_degree() if d == 0]
 
 
 def detect_cycles(g) -> List[List[str]]:
     """Detect all cycles in the graph."""
     try:
+        # One linear acyclicity check spares Johnson's enumeration on DAGs
+        if nx.is_directed_acyclic_graph(g):
+            return []
         return list(nx.simple_cycles(g))
     except Exception:
         return []
 
 
-def layered_layout(g, max_per_layer: Optional[int] = None, separate_roots: bool = False):
+def longest_path_levels(g, order: List[str]) -> Dict[str, int]:
+    """Length of the longest path from any root to each node of a DAG.
+    
+    Args:
+        g: NetworkX directed acyclic graph
+        order: topological order of g's nodes
+    
+    Returns:
+        Dictionary mapping node -> level (0 for roots), in topological order
+    """
+    # A single forward sweep in topological order settles every node before
+    # its successors are visited. (A NumPy np.maximum.at relaxation needs
+    # depth + 1 passes over all edges and measured slower at course-graph sizes.)
+    longest: Dict[str, int] = {n: 0 for n in order}
+    # Successor mapping (dict-of-dicts, or its filtered view for subgraphs);
+    # private, but avoids building an iterator per g.successors() call
+    adj = g._succ
+    for n in order:
+        for succ in adj[n]:
+            longest[succ] = max(longest[succ], longest[n] + 1)
+    return longest
+
+
+def layered_layout(
+    g,
+    max_per_layer: Optional[int] = None,
+    separate_roots: bool = False,
+    levels: Optional[Tuple[List[str], Dict[str, int]]] = None,
+):
     """Compute a tree-like layered layout from bottom to top.
     
     Layout rules:
@@ -78,6 +146,8 @@ def layered_layout(g, max_per_layer: Optional[int] = None, separate_roots: bool
         g: NetworkX directed graph
         max_per_layer: Maximum nodes per row. If exceeded, create sub-layers.
         separate_roots: Legacy parameter, ignored (roots are always at bottom)
+        levels: optional precomputed (topological order, longest_path_levels) of g,
+            e.g. from a depth trim, to avoid sorting and layering twice
     
     Returns:
         Dictionary mapping node -> (x, y) position
@@ -85,17 +155,19 @@ def layered_layout(g, max_per_layer: Optional[int] = None, separate_roots: bool
     if len(g.nodes) == 0:
         return {}
     
-    try:
-        order = list(nx.topological_sort(g))
-    except Exception:
-        # If graph has cycles, fall back to spring layout
-        return nx.spring_layout(g, seed=42)
-    
-    # Calculate longest path from roots for each node (层级)
-    longest: Dict[str, int] = {n: 0 for n in order}
-    for n in order:
-        for succ in g.successors(n):
-            longest[succ] = max(longest.get(succ, 0), longest[n] + 1)
+    if levels is not None:
+        order, longest = levels
+    else:
+        try:
+            order = list(nx.topological_sort(g))
+        except Exception:
+            # If graph has cycles, fall back to spring layout
+            return nx.spring_layout(g, seed=42)
+        
+        # Calculate longest path from roots for each node (层级)
+        longest = longest_path_levels(g, order)
+    in_deg = dict(g.in_degree())
+    out_deg = dict(g.out_degree())
     
     # Group nodes by their layer level
     by_rank: Dict[int, List[str]] = {}
@@ -112,7 +184,7 @@ def layered_layout(g, max_per_layer: Optional[int] = None, separate_roots: bool
     for rank in ranks_sorted:
         nodes = by_rank[rank]
         # Sort nodes for stable layout
-        nodes_sorted = sorted(nodes, key=lambda n: (g.out_degree(n), g.in_degree(n), n))
+        nodes_sorted = sorted(nodes, key=lambda n: (out_deg[n], in_deg[n], n))
         
         if max_per_layer and max_per_layer > 0 and len(nodes_sorted) > max_per_layer:
             # Split into multiple sub-layers
@@ -135,44 +207,43 @@ def layered_layout(g, max_per_layer: Optional[int] = None, separate_roots: bool
     y_margin = 0.08  # 顶部和底部边距
     y_usable = 1.0 - 2 * y_margin  # 可用的Y轴空间
     
-    for sublayer_idx, (rank, sub_idx, nodes) in enumerate(sublayers):
-        # Find how many sub-layers belong to this rank
-        sublayers_in_rank = sum(1 for r, _, _ in sublayers if r == rank)
-        
-        # Calculate y position: bottom to top
-        # rank determines the main layer (0 at bottom, higher numbers go up)
-        # sub_idx distributes within the layer's vertical space
-        if total_main_layers == 1:
-            base_y = 0.5
-        else:
-            # Invert y: rank 0 (roots) at y=0 (bottom), higher ranks go up
-            # 增加层间距，使用更大的垂直空间
-            base_y = y_margin + (rank / (total_main_layers - 1)) * y_usable
-        
-        # If multiple sub-layers, distribute them vertically within the layer spacing
-        if sublayers_in_rank > 1:
-            # Space between main layers - 增加子层间距
-            layer_spacing = y_usable / max(1, total_main_layers - 1) if total_main_layers > 1 else y_usable
-            # Distribute sub-layers within this spacing - 增加到0.9以获得更大间距
-            sub_offset = (sub_idx / sublayers_in_rank) * layer_spacing * 0.9
-            y = base_y + sub_offset
-        else:
-            y = base_y
-        
-        # Calculate x positions for nodes in this sublayer
-        # 增加水平间距，避免节点过于拥挤
+    # Per-sublayer arrays: main rank, index within the rank, sub-layers in that rank
+    ranks = np.array([r for r, _, _ in sublayers], dtype=np.int64)
+    sub_idx = np.array([i for _, i, _ in sublayers], dtype=np.int64)
+    sublayers_in_rank = np.bincount(ranks)[ranks]
+    
+    # Calculate y position: bottom to top
+    # rank determines the main layer (0 at bottom, higher numbers go up)
+    # sub_idx distributes within the layer's vertical space
+    if total_main_layers == 1:
+        base_y = np.full(len(sublayers), 0.5)
+        layer_spacing = y_usable
+    else:
+        # Invert y: rank 0 (roots) at y=0 (bottom), higher ranks go up
+        # 增加层间距，使用更大的垂直空间
+        base_y = y_margin + (ranks / (total_main_layers - 1)) * y_usable
+        # Space between main layers - 增加子层间距
+        layer_spacing = y_usable / (total_main_layers - 1)
+    
+    # If multiple sub-layers, distribute them vertically within the layer spacing
+    # Distribute sub-layers within this spacing - 增加到0.9以获得更大间距
+    sub_offset = (sub_idx / sublayers_in_rank) * layer_spacing * 0.9
+    ys = np.where(sublayers_in_rank > 1, base_y + sub_offset, base_y).tolist()
+    
+    # Calculate x positions for nodes in each sublayer
+    # 增加水平间距，避免节点过于拥挤
+    x_margin = 0.05  # 左右边距
+    x_usable = 1.0 - 2 * x_margin  # 可用的X轴空间
+    
+    for (_, _, nodes), y in zip(sublayers, ys):
         count = len(nodes)
-        x_margin = 0.05  # 左右边距
-        x_usable = 1.0 - 2 * x_margin  # 可用的X轴空间
-        
-        for i, node in enumerate(nodes):
-            if count == 1:
-                x = 0.5
-            else:
-                # Spread horizontally with larger margins
-                # 确保节点间有足够间距
-                x = x_margin + x_usable * (i / (count - 1))
-            pos[node] = (x, y)
+        if count == 1:
+            xs = [0.5]
+        else:
+            # Spread horizontally with larger margins
+            # 确保节点间有足够间距
+            xs = (x_margin + x_usable * (np.arange(count) / (count - 1))).tolist()
+        pos.update(zip(nodes, ((x, y) for x in xs)))
     
     # Ensure all nodes have positions
     for n in g.nodes:
@@ -182,6 +253,37 @@ def layered_layout(g, max_per_layer: Optional[int] = None, separate_roots: bool
     return pos
 
 
+def _layout_cache_key(g, **params) -> str:
+    """Hash of the graph (nodes and edges in order) and the layout parameters."""
+    h = hashlib.blake2b(digest_size=16)
+    payload = {
+        "nodes": list(g.nodes),
+        "edges": list(g.edges),
+        "params": params,
+    }
+    h.update(json.dumps(payload, sort_keys=True, default=str).encode("utf-8"))
+    return h.hexdigest()
+
+
+def _read_cached_layout(path: str) -> Optional[Dict[str, Tuple[float, float]]]:
+    """Return cached positions if the cache file exists and is readable."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return {n: (xy[0], xy[1]) for n, xy in data.items()}
+
+
+def _write_cached_layout(path: str, pos) -> None:
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({n: [float(x), float(y)] for n, (x, y) in pos.items()}, f)
+    except OSError:
+        pass
+
+
 def render_dependency_tree(
     db_path: str,
     out_path: str,
@@ -195,12 +297,15 @@ def render_dependency_tree(
     exclude_isolated: bool = True,
     straight_edges: bool = True,
     reduce_transitive: bool = True,
+    layout_cache: bool = True,
+    layout_cache_dir: Optional[str] = None,
+    data: Optional[Tuple[Dict[str, Dict], List[Tuple[str, str]], Dict[str, Set[str]]]] = None,
 ) -> str:
-    """Render the course dependency DAG as a PNG image.
+    """Render the course dependency DAG as a PNG (or SVG) image.
 
     Args:
         db_path: path to SQLite DB
-        out_path: output image path (.png recommended)
+        out_path: output image path (.png recommended; .svg writes vector output)
         highlight_cycles: color cycle edges red
         focus: if provided, only render the subgraph reachable from this course (its prerequisites chain)
         layered: use layered layout (vs spring layout) - default True for tree-like hierarchy
@@ -211,12 +316,19 @@ def render_dependency_tree(
         exclude_isolated: remove courses with no prerequisites and no dependents - default True
         straight_edges: draw straight edges (no curvature) - default True
         reduce_transitive: remove redundant transitive edges (e.g., A→B→C removes A→C) - default True
+        layout_cache: reuse node positions computed for the same graph and layout
+            options, stored in `layout_cache_dir` under a hash of both - default True
+        layout_cache_dir: directory of cached layouts (default: `.layout_cache` next to db_path)
+        data: pre-loaded (courses, edges, exclusions) for db_path; skips reading SQLite
         
     Returns:
         Path to written image file.
     """
-    courses, edges = load_relations(db_path)
-    excl_map = load_exclusions(db_path)
+    if data is None:
+        courses, edges = load_relations(db_path)
+        excl_map = load_exclusions(db_path)
+    else:
+        courses, edges, excl_map = data
     g = build_graph(courses, edges)
     
     # Remove transitive edges to simplify the graph
@@ -225,51 +337,60 @@ def render_dependency_tree(
     
     # Optionally remove isolated nodes (no incoming and no outgoing edges)
     if exclude_isolated:
-        iso = [n for n in list(g.nodes) if g.in_degree(n) == 0 and g.out_degree(n) == 0]
+        in_deg = dict(g.in_degree())
+        out_deg = dict(g.out_degree())
+        iso = [n for n, d in in_deg.items() if d == 0 and out_deg[n] == 0]
         if iso:
             g.remove_nodes_from(iso)
     
+    levels = None
     if focus and focus in g.nodes:
         # Limit to prerequisites ancestors of focus
         if max_depth is None:
             ancestors = nx.ancestors(g, focus)
             sub_nodes = ancestors | {focus}
         else:
-            # Traverse reversed graph up to max_depth levels
-            gr = g.reverse()
-            sub_nodes = {focus}
-            frontier = {focus}
-            for _ in range(max_depth):
-                nxt = set()
-                for n in frontier:
-                    nxt.update(gr.successors(n))
-                sub_nodes |= nxt
-                frontier = nxt
-        g = g.subgraph(sub_nodes).copy()
+            # Prerequisites up to max_depth levels: BFS on a reversed view
+            gr = g.reverse(copy=False)
+            sub_nodes = set(nx.single_source_shortest_path_length(gr, focus, cutoff=max_depth))
+        # Read-only view: nothing below mutates the graph
+        g = g.subgraph(sub_nodes)
     elif max_depth is not None:
         # Global trim by level from roots
         try:
             order = list(nx.topological_sort(g))
-            longest: Dict[str, int] = {n: 0 for n in order}
-            for n in order:
-                for succ in g.successors(n):
-                    longest[succ] = max(longest.get(succ, 0), longest[n] + 1)
+            longest = longest_path_levels(g, order)
             keep = {n for n, lv in longest.items() if lv <= max_depth}
-            g = g.subgraph(keep).copy()
+            g = g.subgraph(keep)
+            # Every ancestor of a kept node is kept too, so the levels (and the
+            # filtered order) are unchanged on the trimmed graph
+            order = [n for n in order if n in keep]
+            levels = (order, {n: longest[n] for n in order})
         except Exception:
             pass
     
     cycles = detect_cycles(g) if highlight_cycles else []
     cycle_edges: Set[Tuple[str, str]] = set()
-    for cyc in cycles:
-        if len(cyc) >= 2:
-            for i in range(len(cyc)):
-                a = cyc[i]
-                b = cyc[(i + 1) % len(cyc)]
-                if g.has_edge(a, b):
-                    cycle_edges.add((a, b))
-    
-    pos = layered_layout(g, max_per_layer=max_per_layer) if layered else layered_layout(g, max_per_layer=None)
+    if cycles:
+        edge_set = set(g.edges)
+        for cyc in cycles:
+            if len(cyc) >= 2:
+                # Consecutive pairs, wrapping around to close the cycle
+                cycle_edges.update(e for e in zip(cyc, cyc[1:] + cyc[:1]) if e in edge_set)
+    
+    layout_max = max_per_layer if layered else None
+    pos = None
+    if layout_cache:
+        cache_dir = layout_cache_dir or os.path.join(os.path.dirname(os.path.abspath(db_path)), ".layout_cache")
+        cache_key = _layout_cache_key(
+            g, max_per_layer=layout_max, focus=focus, max_depth=max_depth, reduce_transitive=reduce_transitive,
+        )
+        cache_file = os.path.join(cache_dir, cache_key + ".json")
+        pos = _read_cached_layout(cache_file)
+    if pos is None:
+        pos = layered_layout(g, max_per_layer=layout_max, levels=levels)
+        if layout_cache:
+            _write_cached_layout(cache_file, pos)
     
     # Dynamic figure size based on layers and max layer width
     # Calculate actual number of visual rows (including sub-layers)
@@ -283,11 +404,16 @@ def render_dependency_tree(
     # Height based on number of rows - 增加每层的垂直空间
     height = min(max(10, 2.8 * num_visual_rows), 60)
     
-    plt.figure(figsize=(width, height))
+    fig = Figure(figsize=(width, height))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111)
     
     # Node labels: code plus full title with word wrapping
     def wrap_title(title: str, max_words_per_line: int = 3) -> str:
         """将标题按单词数换行"""
+        # Fast path: titles are whitespace-normalized, so few spaces means few words
+        if title.count(' ') < max_words_per_line:
+            return title
         words = title.split()
         if len(words) <= max_words_per_line:
             return title
@@ -297,25 +423,29 @@ def render_dependency_tree(
             lines.append(' '.join(words[i:i + max_words_per_line]))
         return '\n'.join(lines)
     
+    # Label text below the code, shared by nodes with the same title and exclusions
+    label_cache: Dict[Tuple[str, Optional[frozenset]], str] = {}
     labels = {}
     for n in g.nodes:
         title_raw = (g.nodes[n].get('title') or '').strip()
-        title_wrapped = wrap_title(title_raw, max_words_per_line=3)
-        
-        # 构建标签内容
-        label_parts = [n, title_wrapped]
-        
-        # 添加互斥课程信息
         excl = excl_map.get(n)
-        if excl:
-            exlist = sorted(excl)
-            if len(exlist) > 5:
-                text = ", ".join(exlist[:5]) + f" (+{len(exlist)-5})"
-            else:
-                text = ", ".join(exlist)
-            label_parts.append(f"Excl: {text}")
+        key = (title_raw, frozenset(excl) if excl else None)
+        body = label_cache.get(key)
+        if body is None:
+            # 构建标签内容
+            body = wrap_title(title_raw, max_words_per_line=3)
+            
+            # 添加互斥课程信息
+            if excl:
+                exlist = sorted(excl)
+                if len(exlist) > 5:
+                    text = ", ".join(exlist[:5]) + f" (+{len(exlist)-5})"
+                else:
+                    text = ", ".join(exlist)
+                body = f"{body}\nExcl: {text}"
+            label_cache[key] = body
         
-        labels[n] = '\n'.join(label_parts)
+        labels[n] = f"{n}\n{body}"
     
     # ========== 按父节点（源节点）分组绘制彩色连接线 ==========
     # 普通边：按父节点（前置课程）分组，每个父节点的所有出边使用相同颜色
@@ -335,71 +465,43 @@ def render_dependency_tree(
     
     # 优先使用tab20/tab20b/tab20c组合，提供高对比度的离散颜色
     if num_sources > 0:
-        # 定义多组高对比度的颜色池
-        distinct_colors = [
-            '#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd',  # tab10
-            '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22', '#17becf',
-            '#aec7e8', '#ffbb78', '#98df8a', '#ff9896', '#c5b0d5',  # tab20 浅色
-            '#c49c94', '#f7b6d2', '#c7c7c7', '#dbdb8d', '#9edae5',
-            '#393b79', '#637939', '#8c6d31', '#843c39', '#7b4173',  # tab20b
-            '#bd9e39', '#ad494a', '#a55194', '#6b6ecf', '#b5cf6b',
-        ]
-        
         # 循环使用颜色池
-        source_colors = {src: distinct_colors[i % len(distinct_colors)] 
+        source_colors = {src: _DISTINCT_COLORS[i % len(_DISTINCT_COLORS)] 
                         for i, src in enumerate(source_nodes)}
     else:
         source_colors = {}
     
     # 绘制节点 - 使用连接线颜色（如果该节点是父节点）
-    node_colors = []
-    for node in g.nodes:
-        if node in source_colors:
-            # 如果是父节点，使用其连接线颜色
-            node_colors.append(source_colors[node])
-        else:
-            # 如果不是父节点（叶子节点），使用默认灰色
-            node_colors.append('#cccccc')
-    
-    nx.draw_networkx_nodes(g, pos, node_size=650, node_color=node_colors, alpha=0.85, edgecolors='black', linewidths=1)
-    
-    # 绘制边
-    if straight_edges:
-        # 使用直线绘制边，按父节点分组着色
-        for src, edges_list in edges_by_source.items():
-            color = source_colors.get(src, "#2E5090")
-            nx.draw_networkx_edges(
-                g, pos, edgelist=edges_list,
-                edge_color=color, arrows=True, arrowstyle='-|>',
-                arrowsize=15, width=1.5, alpha=0.7, node_size=650
-            )
-        
-        # 绘制循环依赖边（红色）
-        if cycle_edges:
-            nx.draw_networkx_edges(
-                g, pos, edgelist=list(cycle_edges),
-                edge_color='#D32F2F', arrows=True, arrowstyle='-|>',
-                arrowsize=15, width=2.5, alpha=0.8, node_size=650
-            )
-    else:
-        # 使用曲线绘制边
-        for src, edges_list in edges_by_source.items():
-            color = source_colors.get(src, "#2E5090")
-            nx.draw_networkx_edges(
-                g, pos, edgelist=edges_list,
-                edge_color=color, arrows=True, arrowstyle='-|>',
-                arrowsize=15, width=1.5, alpha=0.7, connectionstyle='arc3,rad=0.1', node_size=650
-            )
-        
-        if cycle_edges:
-            nx.draw_networkx_edges(
-                g, pos, edgelist=list(cycle_edges),
-                edge_color='#D32F2F', arrows=True, arrowstyle='-|>',
-                arrowsize=15, width=2.5, alpha=0.8, connectionstyle='arc3,rad=0.1', node_size=650
-            )
+    # 父节点使用其连接线颜色，叶子节点使用默认灰色；nodelist 固定绘制顺序
+    nodelist = list(g.nodes)
+    source_set = set(source_colors)
+    node_colors = [source_colors[n] if n in source_set else '#cccccc' for n in nodelist]
+    
+    nx.draw_networkx_nodes(g, pos, nodelist=nodelist, node_size=650, node_color=node_colors, alpha=0.85, edgecolors='black', linewidths=1, ax=ax)
+    
+    # 绘制边：直线或曲线
+    edge_style = {} if straight_edges else {'connectionstyle': 'arc3,rad=0.1'}
+    
+    # 所有普通边一次绘制，按父节点分组着色（保持原有分组顺序）
+    grouped_edges = [e for edges_list in edges_by_source.values() for e in edges_list]
+    if grouped_edges:
+        nx.draw_networkx_edges(
+            g, pos, edgelist=grouped_edges,
+            edge_color=[source_colors.get(src, "#2E5090") for src, _ in grouped_edges],
+            arrows=True, arrowstyle='-|>',
+            arrowsize=15, width=1.5, alpha=0.7, node_size=650, ax=ax, **edge_style
+        )
+    
+    # 绘制循环依赖边（红色）
+    if cycle_edges:
+        nx.draw_networkx_edges(
+            g, pos, edgelist=list(cycle_edges),
+            edge_color='#D32F2F', arrows=True, arrowstyle='-|>',
+            arrowsize=15, width=2.5, alpha=0.8, node_size=650, ax=ax, **edge_style
+        )
     
     # 绘制标签，居中对齐
-    nx.draw_networkx_labels(g, pos, labels=labels, font_size=8, horizontalalignment='center', verticalalignment='center')
+    nx.draw_networkx_labels(g, pos, labels=labels, font_size=8, horizontalalignment='center', verticalalignment='center', ax=ax)
     
     title = "Course Dependency Tree (Bottom: Prerequisites → Top: Dependents)"
     if focus:
@@ -409,22 +511,67 @@ def render_dependency_tree(
     if max_per_layer:
         title += f" | Max/Layer: {max_per_layer}"
     
-    plt.title(title, fontsize=11, pad=20)  # 增加标题间距
+    ax.set_title(title, fontsize=11, pad=20)  # 增加标题间距
     
     # Set y-axis with roots at bottom (y=0)
-    ax = plt.gca()
     # 增加上下边距，避免节点被裁切
     ax.set_ylim(-0.08, 1.08)
     ax.set_xlim(-0.03, 1.03)  # 增加左右边距
     ax.invert_yaxis()  # Invert so y=0 is at bottom, y=1 at top
-    plt.axis("off")
+    ax.axis("off")
     os.makedirs(os.path.dirname(out_path), exist_ok=True)
-    plt.tight_layout()
-    plt.savefig(out_path, dpi=150)
-    plt.close()
+    fig.tight_layout()
+    if out_path.lower().endswith('.svg'):
+        # Vector output: nothing is rasterized, dpi does not apply
+        fig.savefig(out_path, format='svg', bbox_inches='tight', pad_inches=0.1)
+    else:
+        # Keep the raster within a fixed pixel budget on the longest side
+        dpi = min(150, max(60, _MAX_IMAGE_PX / max(width, height)))
+        fig.savefig(out_path, dpi=dpi, bbox_inches='tight', pad_inches=0.1)
     return out_path
 
 
+def _init_render_worker() -> None:
+    import matplotlib
+    matplotlib.use("Agg")
+
+
+def _render_job(db_path: str, data, job: Dict[str, Any]) -> str:
+    return render_dependency_tree(db_path, data=data, **job)
+
+
+def render_many(db_path: str, jobs: List[Dict[str, Any]], n_workers: Optional[int] = None) -> List[str]:
+    """Render several dependency trees from one database in parallel processes.
+    
+    The database is read once here and handed to every worker, so workers
+    never open SQLite. Workers use the spawn start method (matplotlib is not
+    fork-safe) with the Agg backend; callers need the usual
+    ``if __name__ == "__main__"`` guard.
+    
+    Args:
+        db_path: path to SQLite DB
+        jobs: keyword arguments for render_dependency_tree, one dict per image
+            (each must contain out_path)
+        n_workers: worker processes (default: CPU count, capped at len(jobs))
+        
+    Returns:
+        Paths to written image files, in job order.
+    """
+    courses, edges = load_relations(db_path)
+    data = (courses, edges, load_exclusions(db_path))
+    n = min(len(jobs), n_workers or os.cpu_count() or 1)
+    if n <= 1:
+        return [render_dependency_tree(db_path, data=data, **job) for job in jobs]
+    with ProcessPoolExecutor(
+        max_workers=n,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_render_worker,
+    ) as ex:
+        futures = [ex.submit(_render_job, db_path, data, job) for job in jobs]
+        return [f.result() for f in futures]
+
+
 __all__ = [
     "render_dependency_tree",
+    "render_many",
 ]
@@ -6,7 +6,7 @@ Renders courses that have no prerequisites and no dependents (terminal courses).
 from __future__ import annotations
 
 import os
-from typing import Dict, Tuple, List
+from typing import Dict, Tuple, List, Optional
 
 try:
     import networkx as nx  # type: ignore
@@ -24,6 +24,7 @@ def render_root_courses(
     truncate_title: int = 40,
     color_by_unit: bool = True,
     max_per_row: int = 8,
+    data: Optional[Tuple[Dict[str, Dict], List[Tuple[str, str]]]] = None,
 ) -> str:
     """Render courses that have no prerequisites and no dependents.
 
@@ -36,15 +37,17 @@ def render_root_courses(
         truncate_title: truncate course title to this length
         color_by_unit: color nodes by offering unit
         max_per_row: maximum number of nodes per row in grid layout
+        data: pre-loaded (courses, edges) for db_path; skips reading SQLite
         
     Returns:
         Path to written image file.
     """
-    courses, edges = load_relations(db_path)
+    courses, edges = load_relations(db_path) if data is None else data
     g = build_graph(courses, edges)
     
     # Select nodes that have NO prerequisites and NO dependents
-    roots = [n for n in g.nodes if g.in_degree(n) == 0 and g.out_degree(n) == 0]
+    out_deg = dict(g.out_degree())
+    roots = [n for n, d in g.in_degree() if d == 0 and out_deg[n] == 0]
     
     # Build a simple grid layout
     rows: List[List[str]] = []
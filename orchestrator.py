@@ -1,31 +1,201 @@
 import argparse
 import json
+import multiprocessing
 import os
 import sys
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
 from pathlib import Path
-from typing import List
-
-try:
-    import tomllib  # Python 3.11+
-except ImportError:
-    import tomli as tomllib  # fallback for older Python
-
-from core.scraper.major_scraper import scrape_major_pages
-from core.dp_build.export import save_json, save_csv
-from core.dp_build.db_builder import build_course_db
-from core.filter.check import load_allowed_codes, filter_db_by_allowed
-from core.vis.dependency import render_dependency_tree
-from core.vis.roots import render_root_courses
+from typing import List, Optional, Tuple
+
+# Heavy pipeline modules (requests/bs4/networkx/matplotlib) are imported
+# inside the handlers that use them, so help / init-config / show-config
+# start without loading them.
 from core.config import load_config as _load_config
-from core.query import interactive_course_query
 
-DEFAULT_OUTPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "outputs")
-DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache")
-os.makedirs(DEFAULT_OUTPUT_DIR, exist_ok=True)
+# Repository paths, resolved once at import
+_HERE = Path(__file__).resolve().parent
+_CONFIG_DIR = _HERE / "config"
+_SCRAPER_TOML = _CONFIG_DIR / "scraper.toml"
+_CITYU_TOML = _CONFIG_DIR / "cityu.toml"
+
+DEFAULT_OUTPUT_DIR = _HERE / "outputs"
+DEFAULT_CACHE_DIR = _HERE / "cache"
+DEFAULT_OUTPUT_DIR.mkdir(exist_ok=True)
+
+_BANNER = "=" * 60
+
+
+def _write_lines(*lines: str) -> None:
+    """Print a block of lines with one write (and one flush) instead of a print per line."""
+    sys.stdout.write("\n".join(lines) + "\n")
+    sys.stdout.flush()
+
+
+def _settings_lines(args: argparse.Namespace, mode: str) -> List[str]:
+    """Effective visualize settings, as printed in verbose mode."""
+    return [
+        f"[visualize] settings ({mode})",
+        f"  db= {args.db}",
+        f"  roots_only= {getattr(args, 'roots_only', False)}",
+        f"  highlight_cycles= {getattr(args, 'highlight_cycles', False)}",
+        f"  no_layered= {getattr(args, 'no_layered', False)}",
+        f"  max_depth= {getattr(args, 'max_depth', None)}",
+        f"  truncate_title= {getattr(args, 'truncate_title', None)}",
+        f"  no_unit_colors= {getattr(args, 'no_unit_colors', False)}",
+        f"  max_per_layer= {getattr(args, 'max_per_layer', None)}",
+        f"  exclude_isolated= {not getattr(args, 'include_isolated', False)}",
+        f"  straight_edges= {not getattr(args, 'curved_edges', False)}",
+        f"  reduce_transitive= {getattr(args, 'reduce_transitive', True)}",
+    ]
+
+
+def _dumps(obj) -> str:
+    """Pretty-print obj as JSON (2-space indent, non-ASCII kept), via orjson when installed."""
+    try:  # optional; imported here so other commands don't pay for it
+        import orjson  # type: ignore
+    except ImportError:  # pragma: no cover
+        return json.dumps(obj, ensure_ascii=False, indent=2)
+    return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode("utf-8")
+
+
+# Values that count as "not given on the CLI" when filling args from config
+_UNSET_VALUES = (False, None, 0, "")
+
+
+def _allocate_version_dir(base: Path) -> Path:
+    """Create and return the next outputs/vNNN directory.
+    
+    The last number handed out is kept in base/.next_version, so this is one
+    small read + write instead of a scan of every existing version dir. The
+    directory is scanned only once, to seed the counter when the file is missing.
+    """
+    base.mkdir(parents=True, exist_ok=True)
+    counter = base / ".next_version"
+    try:
+        n = int(counter.read_text(encoding="utf-8").strip() or 0)
+    except (OSError, ValueError):
+        # scandir's DirEntry carries the file type from readdir, so no stat per entry
+        with os.scandir(base) as it:
+            nums = [int(e.name[1:]) for e in it
+                    if len(e.name) > 1 and e.name[0] == "v" and e.name[1:].isdigit()
+                    and e.is_dir(follow_symlinks=False)]
+        n = max(nums, default=0)
+    while True:
+        n += 1
+        vdir = base / f"v{n:03d}"
+        try:
+            vdir.mkdir()
+            break
+        except FileExistsError:  # created outside this counter
+            continue
+    tmp = counter.with_name(counter.name + ".tmp")
+    try:
+        tmp.write_text(str(n), encoding="utf-8")
+        os.replace(tmp, counter)
+    except OSError:
+        pass
+    return vdir
+
+
+def _share_render_data(dep_job: dict, roots_job: dict) -> Tuple[dict, dict]:
+    """Both bundle images usually come from the same DB: read it once over one
+    connection and hand the rows to each render, so workers never open SQLite."""
+    from core.vis.common import open_readonly, load_relations, load_exclusions
+    
+    if dep_job["db_path"] != roots_job["db_path"] or "data" in dep_job or "data" in roots_job:
+        return dep_job, roots_job
+    conn = open_readonly(dep_job["db_path"])
+    try:
+        courses, edges = load_relations(dep_job["db_path"], conn=conn)
+        excl_map = load_exclusions(dep_job["db_path"], conn=conn)
+    finally:
+        conn.close()
+    return dict(dep_job, data=(courses, edges, excl_map)), dict(roots_job, data=(courses, edges))
+
+
+def _render_pool() -> ProcessPoolExecutor:
+    from core.vis.dependency import _init_render_worker
+    
+    # spawn: matplotlib is neither thread- nor fork-safe
+    return ProcessPoolExecutor(
+        max_workers=2,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_render_worker,
+    )
+
+
+def _submit_render_pair(ex: ProcessPoolExecutor, dep_job: dict, roots_job: dict) -> Tuple[Future, Future]:
+    from core.vis.dependency import render_dependency_tree
+    from core.vis.roots import render_root_courses
+    
+    return ex.submit(render_dependency_tree, **dep_job), ex.submit(render_root_courses, **roots_job)
+
+
+def _report_render_error(fut: Future) -> None:
+    """Done-callback for background renders: print a failure as soon as it happens."""
+    if fut.cancelled() or fut.exception() is None:
+        return
+    import traceback
+    sys.stderr.write("\n✗ 可视化失败 / Visualization failed:\n" + "".join(traceback.format_exception(fut.exception())))
+    sys.stderr.flush()
+
+
+def _render_pair(dep_job: dict, roots_job: dict) -> Tuple[str, str]:
+    """Render a bundle's dependency graph and roots-only graph side by side.
+    
+    The two images are independent, so each is drawn in its own spawned
+    worker process. The database is read once up front (_share_render_data).
+    """
+    dep_job, roots_job = _share_render_data(dep_job, roots_job)
+    if (os.cpu_count() or 1) <= 1:
+        from core.vis.dependency import render_dependency_tree
+        from core.vis.roots import render_root_courses
+        return render_dependency_tree(**dep_job), render_root_courses(**roots_job)
+    with _render_pool() as ex:
+        dep_fut, roots_fut = _submit_render_pair(ex, dep_job, roots_job)
+        return dep_fut.result(), roots_fut.result()
+
+
+def _scrape_shard(urls: List[str], opts: dict) -> list:
+    from core.scraper.major_scraper import scrape_major_pages
+    return scrape_major_pages(urls, **opts)
+
+
+def _iter_sharded(urls: List[str], opts: dict, n_shards: int):
+    """Scrape urls in n_shards worker processes, yielding pages in URL order.
+    
+    Each task is a single URL and at most 2 * n_shards are in flight, so only
+    a few pages wait in memory ahead of the writer. Concurrency is split
+    across the workers (delay stays a per-worker pause) and host_qps is
+    divided between them, so the site sees at most the request rate of a
+    single process. The CPUs are split too:
+    each worker gets cpu_count // n_shards course-parse processes (1 = parse
+    inline), instead of a full-size parse pool per worker.
+    """
+    shard_opts = dict(
+        opts,
+        concurrency=max(1, opts["concurrency"] // n_shards),
+        host_qps=opts.get("host_qps", 0.0) / n_shards,
+        parse_workers=max(1, (os.cpu_count() or 1) // n_shards),
+    )
+    todo = iter(urls)
+    with ProcessPoolExecutor(max_workers=n_shards, mp_context=multiprocessing.get_context("spawn")) as ex:
+        pending = deque(ex.submit(_scrape_shard, [u], shard_opts) for u in islice(todo, 2 * n_shards))
+        while pending:
+            pages = pending.popleft().result()
+            u = next(todo, None)
+            if u is not None:
+                pending.append(ex.submit(_scrape_shard, [u], shard_opts))
+            yield from pages
 
 
 def cmd_scrape_major(args: argparse.Namespace) -> int:
     """CLI handler for scrape-major command."""
+    from core.scraper.major_scraper import iter_major_pages
+    from core.dp_build.export import save_json_stream, save_csv
+    
     # Read URLs from argument or file
     urls: List[str] = []
     if args.url:
@@ -34,9 +204,7 @@ def cmd_scrape_major(args: argparse.Namespace) -> int:
         with open(args.file, "r", encoding="utf-8") as f:
             urls = [l.strip() for l in f if l.strip() and not l.startswith("#")]
     
-    # Call core scraping logic
-    results = scrape_major_pages(
-        urls,
+    opts = dict(
         delay=args.delay,
         timeout=args.timeout,
         retries=args.retries,
@@ -44,49 +212,65 @@ def cmd_scrape_major(args: argparse.Namespace) -> int:
         include_courses=args.courses,
         concurrency=args.concurrency,
         cache_dir=args.cache_dir,
+        revalidate=args.revalidate,
+        host_qps=args.host_qps,
     )
+    
+    # Call core scraping logic; pages are written out as they are parsed.
+    # Many majors with --concurrency > 1: one worker process per shard of URLs.
+    n_shards = min(os.cpu_count() or 1, len(urls)) if args.concurrency > 1 else 1
+    if n_shards > 1:
+        results = _iter_sharded(urls, opts, n_shards)
+    else:
+        results = iter_major_pages(urls, **opts)
 
-    out_dir = args.out_dir or DEFAULT_OUTPUT_DIR
-    os.makedirs(out_dir, exist_ok=True)
-    out_path = os.path.join(out_dir, args.out)
+    out_dir = Path(args.out_dir or DEFAULT_OUTPUT_DIR)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    out_path = str(out_dir / args.out)
     if args.format == "json":
-        save_json(results, out_path)
+        count = save_json_stream(results, out_path)
     else:
-        save_csv(results, out_path)
+        count = save_csv(results, out_path)
     if args.verbose:
-        print(f"Saved {len(results)} records -> {out_path}")
+        print(f"Saved {count} records -> {out_path}")
     return 0
 
 
-def build_db(args: argparse.Namespace) -> int:
-    """CLI handler for build-db command."""
-    # Load scraper config if major_url not provided
+def _resolve_major_url_reset(args: argparse.Namespace) -> Tuple[Optional[str], bool]:
+    """Major URL and reset flag from the CLI, falling back to config/scraper.toml."""
     major_url = args.major_url
     reset = args.reset
     
-    scraper_config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config", "scraper.toml")
-    if os.path.exists(scraper_config_path):
-        with open(scraper_config_path, "rb") as f:
-            config = tomllib.load(f)
-            # Load URL if not provided via command line
-            if not major_url:
-                urls = config.get("scraper", {}).get("urls", [])
-                if urls:
-                    major_url = urls[0]  # Use first URL from config
-                    if args.verbose:
-                        print(f"Using URL from config: {major_url}")
-            # Load reset setting if not provided via command line
-            if not args.reset:
-                reset = config.get("database", {}).get("reset", False)
-                if args.verbose and reset:
-                    print(f"Database reset enabled from config")
+    config = _load_config(str(_SCRAPER_TOML))
+    if config:
+        # Load URL if not provided via command line
+        if not major_url:
+            urls = config.get("scraper", {}).get("urls", [])
+            if urls:
+                major_url = urls[0]  # Use first URL from config
+                if args.verbose:
+                    print(f"Using URL from config: {major_url}")
+        # Load reset setting if not provided via command line
+        if not args.reset:
+            reset = config.get("database", {}).get("reset", False)
+            if args.verbose and reset:
+                print(f"Database reset enabled from config")
+    return major_url, reset
+
+
+def build_db(args: argparse.Namespace) -> int:
+    """CLI handler for build-db command."""
+    from core.dp_build.db_builder import build_course_db
+    
+    # Load scraper config if major_url not provided
+    major_url, reset = _resolve_major_url_reset(args)
     
     if not major_url:
         print("Error: --major-url not provided and no URLs found in config/scraper.toml", file=sys.stderr)
         return 1
     
-    out_dir = args.out_dir or DEFAULT_OUTPUT_DIR
-    db_path = os.path.join(out_dir, args.db)
+    out_dir = Path(args.out_dir or DEFAULT_OUTPUT_DIR)
+    db_path = str(out_dir / args.db)
     
     # Call core DB builder
     stats = build_course_db(
@@ -99,7 +283,9 @@ def build_db(args: argparse.Namespace) -> int:
         concurrency=args.concurrency,
         reset=reset,
         cache_dir=args.cache_dir,
-        out_dir=out_dir,
+        out_dir=str(out_dir),
+        revalidate=args.revalidate,
+        host_qps=args.host_qps,
     )
     
     return 0
@@ -107,39 +293,26 @@ def build_db(args: argparse.Namespace) -> int:
 
 def cmd_run_all(args: argparse.Namespace) -> int:
     """CLI handler for run-all command: build DB + visualize."""
-    # Load scraper config if major_url not provided
-    major_url = args.major_url
-    reset = args.reset
+    from core.dp_build.db_builder import build_course_db
+    from core.net import get_session
+    from core.query import interactive_course_query
     
-    scraper_config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config", "scraper.toml")
-    if os.path.exists(scraper_config_path):
-        with open(scraper_config_path, "rb") as f:
-            config = tomllib.load(f)
-            # Load URL if not provided via command line
-            if not major_url:
-                urls = config.get("scraper", {}).get("urls", [])
-                if urls:
-                    major_url = urls[0]  # Use first URL from config
-                    if args.verbose:
-                        print(f"Using URL from config: {major_url}")
-            # Load reset setting if not provided via command line
-            if not args.reset:
-                reset = config.get("database", {}).get("reset", False)
-                if args.verbose and reset:
-                    print(f"Database reset enabled from config")
+    # Load scraper config if major_url not provided
+    major_url, reset = _resolve_major_url_reset(args)
     
     if not major_url:
         print("Error: --major-url not provided and no URLs found in config/scraper.toml", file=sys.stderr)
         return 1
     
     if args.verbose:
-        print("=" * 60)
-        print("STEP 1/2: Building database from major URL")
-        print("=" * 60)
+        _write_lines(_BANNER, "STEP 1/2: Building database from major URL", _BANNER)
     
     # Step 1: Build database
-    out_dir = args.out_dir or DEFAULT_OUTPUT_DIR
-    db_path = os.path.join(out_dir, args.db)
+    out_dir = Path(args.out_dir or DEFAULT_OUTPUT_DIR)
+    db_path = str(out_dir / args.db)
+    
+    # One HTTP connection pool for the whole run (closed at interpreter exit)
+    session = get_session(args.concurrency)
     
     stats = build_course_db(
         major_url,
@@ -151,48 +324,51 @@ def cmd_run_all(args: argparse.Namespace) -> int:
         concurrency=args.concurrency,
         reset=reset,
         cache_dir=args.cache_dir,
-        out_dir=out_dir,
+        out_dir=str(out_dir),
+        revalidate=args.revalidate,
+        host_qps=args.host_qps,
+        session=session,
     )
     
-    # Step 2: Ask if user wants to generate visualizations
-    print("\n" + "=" * 60)
-    print("是否生成课程依赖关系图？")
-    print("Generate course dependency visualizations?")
-    print("=" * 60)
-    print("输入 'yes' 或 'y' 生成图像，输入 'no' 或 'n' 跳过")
-    print("Enter 'yes' or 'y' to generate, 'no' or 'n' to skip:")
-    
-    user_response = input("> ").strip().lower()
+    # Step 2: Generate visualizations? (--viz yes/no skips the prompt)
+    viz = getattr(args, "viz", "ask")
+    # Scripted --viz yes: render in worker processes while the query session runs
+    # (single-core hosts render inline first, as _render_pair does)
+    background = viz == "yes" and (os.cpu_count() or 1) > 1
+    if viz == "ask":
+        _write_lines(
+            "\n" + _BANNER,
+            "是否生成课程依赖关系图？",
+            "Generate course dependency visualizations?",
+            _BANNER,
+            "输入 'yes' 或 'y' 生成图像，输入 'no' 或 'n' 跳过",
+            "Enter 'yes' or 'y' to generate, 'no' or 'n' to skip:",
+        )
+        
+        user_response = input("> ").strip().lower()
+        viz = "yes" if user_response in ['yes', 'y', '是', '好'] else "no"
     
-    if user_response in ['yes', 'y', '是', '好']:
+    render_pool = None
+    render_futs = None
+    if viz == "yes":
         if args.verbose:
-            print("\n" + "=" * 60)
-            print("STEP 2/3: Generating visualizations")
-            print("=" * 60)
+            _write_lines("\n" + _BANNER, "STEP 2/3: Generating visualizations", _BANNER)
         
         # Generate visualizations (bundle version)
-        version_num = 1
-        version_dir = os.path.join(out_dir, f"v{version_num:03d}")
-        while os.path.exists(version_dir):
-            version_num += 1
-            version_dir = os.path.join(out_dir, f"v{version_num:03d}")
-        os.makedirs(version_dir, exist_ok=True)
-        
-        # Load profile configs
-        config_dir = Path(__file__).parent / "config"
+        vdir = _allocate_version_dir(out_dir)
         
         # Dependency graph
-        dep_cfg_path = config_dir / "visualize_dependency.toml"
+        dep_cfg_path = _CONFIG_DIR / "visualize_dependency.toml"
         dep_cfg = _load_config(str(dep_cfg_path)) if dep_cfg_path.exists() else {}
-        dep_settings = dep_cfg.get("visualize", {}) if isinstance(dep_cfg, dict) else {}
+        dep_settings = dep_cfg.get("visualize", {})
         
-        dep_out = os.path.join(version_dir, f"dependency_v{version_num:03d}.png")
+        dep_out = str(vdir / f"dependency_{vdir.name}.png")
         if args.verbose:
             print(f"\nRendering dependency graph -> {dep_out}")
         
-        render_dependency_tree(
-            db_path,
-            dep_out,
+        dep_job = dict(
+            db_path=db_path,
+            out_path=dep_out,
             highlight_cycles=dep_settings.get("highlight_cycles", True),
             focus=dep_settings.get("focus"),
             layered=not dep_settings.get("no_layered", False),
@@ -206,57 +382,80 @@ def cmd_run_all(args: argparse.Namespace) -> int:
         )
         
         # Roots graph
-        roots_cfg_path = config_dir / "visualize_roots.toml"
+        roots_cfg_path = _CONFIG_DIR / "visualize_roots.toml"
         roots_cfg = _load_config(str(roots_cfg_path)) if roots_cfg_path.exists() else {}
-        roots_settings = roots_cfg.get("visualize", {}) if isinstance(roots_cfg, dict) else {}
+        roots_settings = roots_cfg.get("visualize", {})
         
-        roots_out = os.path.join(version_dir, f"roots_only_v{version_num:03d}.png")
+        roots_out = str(vdir / f"roots_only_{vdir.name}.png")
         if args.verbose:
             print(f"Rendering roots graph -> {roots_out}")
         
-        render_root_courses(
-            db_path,
-            roots_out,
+        roots_job = dict(
+            db_path=db_path,
+            out_path=roots_out,
             truncate_title=roots_settings.get("truncate_title", 40),
             color_by_unit=roots_settings.get("color_by_unit", True),
             max_per_row=roots_settings.get("max_per_row", 1),
         )
         
-        if args.verbose:
-            print(f"\n{'=' * 60}")
-            print(f"✓ 可视化完成！ / Visualization Complete!")
-            print(f"  - Output directory: {version_dir}")
-            print(f"  - Dependency graph: {dep_out}")
-            print(f"  - Roots graph: {roots_out}")
-            print(f"{'=' * 60}")
+        viz_done = [
+            "\n" + _BANNER,
+            "✓ 可视化完成！ / Visualization Complete!",
+            f"  - Output directory: {vdir}",
+            f"  - Dependency graph: {dep_out}",
+            f"  - Roots graph: {roots_out}",
+            _BANNER,
+        ]
+        if background:
+            dep_job, roots_job = _share_render_data(dep_job, roots_job)
+            render_pool = _render_pool()
+            render_futs = _submit_render_pair(render_pool, dep_job, roots_job)
+            for fut in render_futs:
+                fut.add_done_callback(_report_render_error)
+        else:
+            _render_pair(dep_job, roots_job)
+            if args.verbose:
+                _write_lines(*viz_done)
     else:
         if args.verbose:
             print("\n跳过可视化生成 / Skipping visualization")
     
     # Step 3: Interactive course query
     if args.verbose:
-        print("\n" + "=" * 60)
-        print("STEP 3/3: Interactive Course Query")
-        print("=" * 60)
+        _write_lines("\n" + _BANNER, "STEP 3/3: Interactive Course Query", _BANNER)
     
     # Start interactive course query session
-    interactive_course_query(db_path, verbose=args.verbose)
+    try:
+        interactive_course_query(db_path, verbose=args.verbose)
+    finally:
+        if render_pool is not None:
+            render_pool.shutdown(wait=True)
+    # Render failures were already reported by _report_render_error
+    viz_failed = render_futs is not None and any(fut.exception() is not None for fut in render_futs)
+    if render_futs is not None and not viz_failed and args.verbose:
+        _write_lines(*viz_done)
     
     if args.verbose:
-        print(f"\n{'=' * 60}")
-        print(f"✓ 完成！数据库已保存 / Complete! Database saved")
-        print(f"  - Database: {db_path}")
-        print(f"{'=' * 60}")
+        _write_lines(
+            "\n" + _BANNER,
+            "✓ 完成！数据库已保存 / Complete! Database saved",
+            f"  - Database: {db_path}",
+            _BANNER,
+        )
     
-    return 0
+    return 1 if viz_failed else 0
 
 
 def cmd_visualize(args: argparse.Namespace) -> int:
     """CLI handler for visualize command."""
+    from core.filter.check import load_allowed_codes, filter_db_by_allowed
+    from core.vis.dependency import render_dependency_tree
+    from core.vis.roots import render_root_courses
+    
     # If user provided just a filename (no directory), place in outputs/. Otherwise, use as-is.
     def _abs_out(path: str) -> str:
         if not os.path.isabs(path) and os.path.dirname(path) == "":
-            return os.path.join(DEFAULT_OUTPUT_DIR, path)
+            return str(DEFAULT_OUTPUT_DIR / path)
         return path
 
     # Late fallback: if db not set yet, try loading from config path or profile-specific config here
@@ -264,7 +463,7 @@ def cmd_visualize(args: argparse.Namespace) -> int:
         cfg_path = getattr(args, "config", None)
         profile = getattr(args, "profile", None)
         if not cfg_path and profile in {"dependency", "roots"}:
-            cfg_path = str(Path(__file__).parent / "config" / f"visualize_{profile}.toml")
+            cfg_path = str(_CONFIG_DIR / f"visualize_{profile}.toml")
         if cfg_path:
             _cfg = _load_config(cfg_path)
             if isinstance(_cfg.get("visualize"), dict):
@@ -272,58 +471,41 @@ def cmd_visualize(args: argparse.Namespace) -> int:
                 if vsec.get("db"):
                     args.db = vsec["db"]
                 # Populate other visualize settings only if not passed on CLI
+                d = vars(args)
                 for k, v in vsec.items():
-                    if k == "db":
-                        continue
-                    if not hasattr(args, k) or getattr(args, k) in (False, None, 0, ""):
-                        setattr(args, k, v)
+                    if k != "db" and d.get(k) in _UNSET_VALUES:
+                        d[k] = v
 
     # Ensure DB path is provided (typically via config). Avoid proceeding with None.
     if not getattr(args, "db", None):
         print("visualize: missing --db and no [visualize].db in config. Provide a config or --db.", file=sys.stderr)
         return 2
 
+    verbose = getattr(args, "verbose", False)
+    
     # Optional pre-visualization check layer: filter DB to allowed courses if provided
     allowed_file = getattr(args, "allowed_courses_file", None)
     if allowed_file:
         allowed = load_allowed_codes(allowed_file)
         if allowed:
             in_place = getattr(args, "check_in_place", True)
-            args.db = filter_db_by_allowed(args.db, allowed, in_place=in_place, verbose=getattr(args, "verbose", False))
-        elif getattr(args, "verbose", False):
+            args.db = filter_db_by_allowed(args.db, allowed, in_place=in_place, verbose=verbose)
+        elif verbose:
             print(f"[check] allowed_courses_file provided but no codes parsed: {allowed_file}")
 
     # Bundle mode: create next outputs/vNNN and render both dependency and roots-only images
     if getattr(args, "bundle_version", False):
-        if getattr(args, "verbose", False):
-            print("[visualize] settings (bundle)")
-            print("  db=", args.db)
-            print("  roots_only=", getattr(args, "roots_only", False))
-            print("  highlight_cycles=", getattr(args, "highlight_cycles", False))
-            print("  no_layered=", getattr(args, "no_layered", False))
-            print("  max_depth=", getattr(args, "max_depth", None))
-            print("  truncate_title=", getattr(args, "truncate_title", None))
-            print("  no_unit_colors=", getattr(args, "no_unit_colors", False))
-            print("  max_per_layer=", getattr(args, "max_per_layer", None))
-            print("  exclude_isolated=", not getattr(args, "include_isolated", False))
-            print("  straight_edges=", not getattr(args, "curved_edges", False))
-            print("  reduce_transitive=", getattr(args, "reduce_transitive", True))
-        base = Path(DEFAULT_OUTPUT_DIR)
-        base.mkdir(parents=True, exist_ok=True)
-        # find next vNNN
-        existing = [p.name for p in base.iterdir() if p.is_dir() and p.name.startswith("v") and p.name[1:].isdigit()]
-        nums = [int(p[1:]) for p in existing]
-        next_n = (max(nums) + 1) if nums else 1
-        vdir = base / f"v{next_n:03d}"
-        vdir.mkdir(exist_ok=True)
-        dep_path = str(vdir / f"dependency_v{next_n:03d}.png")
-        roots_path = str(vdir / f"roots_only_v{next_n:03d}.png")
-        if args.verbose:
+        if verbose:
+            _write_lines(*_settings_lines(args, "bundle"))
+        vdir = _allocate_version_dir(DEFAULT_OUTPUT_DIR)
+        dep_path = str(vdir / f"dependency_{vdir.name}.png")
+        roots_path = str(vdir / f"roots_only_{vdir.name}.png")
+        if verbose:
             print(f"Bundle version dir: {vdir}")
         # dependency graph (config-controlled)
-        render_dependency_tree(
-            args.db,
-            dep_path,
+        dep_job = dict(
+            db_path=args.db,
+            out_path=dep_path,
             highlight_cycles=args.highlight_cycles,
             focus=args.focus,
             layered=not getattr(args, "no_layered", False),
@@ -336,44 +518,47 @@ def cmd_visualize(args: argparse.Namespace) -> int:
             reduce_transitive=getattr(args, "reduce_transitive", True),
         )
         # roots-only graph: load dedicated config if present (config/visualize_roots.toml)
-        root_cfg_path = Path(__file__).parent / "config" / "visualize_roots.toml"
+        root_cfg_path = _CONFIG_DIR / "visualize_roots.toml"
         if root_cfg_path.exists():
             _rcfg = _load_config(str(root_cfg_path))
-            vsec = _rcfg.get("visualize", {}) if isinstance(_rcfg, dict) else {}
+            vsec = _rcfg.get("visualize", {})
             r_db = vsec.get("db", args.db)
             r_trunc = vsec.get("truncate_title", getattr(args, "truncate_title", 40))
             r_color = not bool(vsec.get("no_unit_colors", getattr(args, "no_unit_colors", False)))
             r_mpr = vsec.get("max_per_layer", getattr(args, "max_per_layer", 16))
-            if args.verbose:
-                print("[visualize] roots-only override via visualize_roots.toml:")
-                print("  db=", r_db)
-                print("  truncate_title=", r_trunc)
-                print("  color_by_unit=", r_color)
-                print("  max_per_row=", r_mpr)
-            render_root_courses(
-                r_db,
-                roots_path,
+            if verbose:
+                _write_lines(
+                    "[visualize] roots-only override via visualize_roots.toml:",
+                    f"  db= {r_db}",
+                    f"  truncate_title= {r_trunc}",
+                    f"  color_by_unit= {r_color}",
+                    f"  max_per_row= {r_mpr}",
+                )
+            roots_job = dict(
+                db_path=r_db,
+                out_path=roots_path,
                 truncate_title=r_trunc,
                 color_by_unit=r_color,
                 max_per_row=r_mpr,
             )
         else:
-            render_root_courses(
-                args.db,
-                roots_path,
+            roots_job = dict(
+                db_path=args.db,
+                out_path=roots_path,
                 truncate_title=getattr(args, "truncate_title", 40),
                 color_by_unit=not getattr(args, "no_unit_colors", False),
                 max_per_row=getattr(args, "max_per_layer", 16),
             )
-        if args.verbose:
+        _render_pair(dep_job, roots_job)
+        if verbose:
             print("Graph images written:", dep_path, roots_path)
         return 0
 
     # Single file mode
     out_path = _abs_out(args.out)
-    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    Path(out_path).parent.mkdir(parents=True, exist_ok=True)
     if getattr(args, "roots_only", False):
-        if args.verbose:
+        if verbose:
             print(f"Rendering roots-only graph from {args.db} -> {out_path}")
         render_root_courses(
             args.db,
@@ -383,20 +568,9 @@ def cmd_visualize(args: argparse.Namespace) -> int:
             max_per_row=getattr(args, "max_per_layer", 16),
         )
     else:
-        if getattr(args, "verbose", False):
-            print("[visualize] settings (single)")
-            print("  db=", args.db)
-            print("  roots_only=", getattr(args, "roots_only", False))
-            print("  highlight_cycles=", getattr(args, "highlight_cycles", False))
-            print("  no_layered=", getattr(args, "no_layered", False))
-            print("  max_depth=", getattr(args, "max_depth", None))
-            print("  truncate_title=", getattr(args, "truncate_title", None))
-            print("  no_unit_colors=", getattr(args, "no_unit_colors", False))
-            print("  max_per_layer=", getattr(args, "max_per_layer", None))
-            print("  exclude_isolated=", not getattr(args, "include_isolated", False))
-            print("  straight_edges=", not getattr(args, "curved_edges", False))
-            print("  reduce_transitive=", getattr(args, "reduce_transitive", True))
-        if args.verbose:
+        if verbose:
+            _write_lines(*_settings_lines(args, "single"))
+        if verbose:
             print(f"Rendering graph from {args.db} -> {out_path}")
         render_dependency_tree(
             args.db,
@@ -412,7 +586,7 @@ def cmd_visualize(args: argparse.Namespace) -> int:
             straight_edges=not getattr(args, "curved_edges", False),
             reduce_transitive=getattr(args, "reduce_transitive", True),
         )
-    if args.verbose:
+    if verbose:
         print("Graph image written:", out_path)
     return 0
 
@@ -426,14 +600,17 @@ def build_parser() -> argparse.ArgumentParser:
     ra = sub.add_parser("run-all", help="Run complete pipeline: scrape + build DB + visualize")
     ra.add_argument("--major-url", help="Major curriculum URL (can be set in config/scraper.toml)")
     ra.add_argument("--db", default="courses.db", help="SQLite filename inside outputs dir")
-    ra.add_argument("--delay", type=float, default=0.2)
+    ra.add_argument("--delay", type=float, default=0.2, help="Pause in seconds after each request, per worker")
+    ra.add_argument("--host-qps", type=float, default=0.0, help="Cap on requests per second to each host across all workers (0 = no cap)")
     ra.add_argument("--retries", type=int, default=3)
     ra.add_argument("--timeout", type=float, default=15.0)
     ra.add_argument("--verbose", action="store_true")
-    ra.add_argument("--concurrency", type=int, default=8, help="Workers to fetch course pages")
+    ra.add_argument("--concurrency", type=int, default=16, help="Workers to fetch course pages")
     ra.add_argument("--reset", action="store_true", help="Drop existing database tables first")
     ra.add_argument("--out-dir", help="Override output directory")
     ra.add_argument("--cache-dir", help="Directory for HTML cache")
+    ra.add_argument("--revalidate", action="store_true", help="Revalidate cached pages with conditional requests (ETag/Last-Modified)")
+    ra.add_argument("--viz", choices=["yes", "no", "ask"], default="ask", help="Generate visualizations: yes (render while the query session runs), no, or ask (prompt, default)")
     ra.set_defaults(func=cmd_run_all)
 
     pm = sub.add_parser("scrape-major", help="Scrape major page(s)")
@@ -443,26 +620,30 @@ def build_parser() -> argparse.ArgumentParser:
     pm.add_argument("--out", required=True, help="Output filename (placed in outputs dir)")
     pm.add_argument("--format", choices=["json", "csv"], default="json")
     pm.add_argument("--courses", action="store_true", help="Also fetch course detail pages")
-    pm.add_argument("--delay", type=float, default=0.0)
+    pm.add_argument("--delay", type=float, default=0.0, help="Pause in seconds after each request, per worker")
+    pm.add_argument("--host-qps", type=float, default=0.0, help="Cap on requests per second to each host across all workers (0 = no cap)")
     pm.add_argument("--retries", type=int, default=3)
     pm.add_argument("--timeout", type=float, default=15.0)
     pm.add_argument("--verbose", action="store_true")
     pm.add_argument("--concurrency", type=int, default=1, help="Number of workers to fetch course pages (when --courses)")
     pm.add_argument("--out-dir", help="Override output directory (default outputs/)")
     pm.add_argument("--cache-dir", help="Directory for HTML cache (default: none)")
+    pm.add_argument("--revalidate", action="store_true", help="Revalidate cached pages with conditional requests (ETag/Last-Modified)")
     pm.set_defaults(func=cmd_scrape_major)
 
     db = sub.add_parser("build-db", help="Create SQLite DB of courses for a major")
     db.add_argument("--major-url", help="Major curriculum URL (can be set in config/scraper.toml)")
     db.add_argument("--db", default="courses.db", help="SQLite filename inside outputs dir")
-    db.add_argument("--delay", type=float, default=0.2)
+    db.add_argument("--delay", type=float, default=0.2, help="Pause in seconds after each request, per worker")
+    db.add_argument("--host-qps", type=float, default=0.0, help="Cap on requests per second to each host across all workers (0 = no cap)")
     db.add_argument("--retries", type=int, default=3)
     db.add_argument("--timeout", type=float, default=15.0)
     db.add_argument("--verbose", action="store_true")
-    db.add_argument("--concurrency", type=int, default=4, help="Workers to fetch course pages")
+    db.add_argument("--concurrency", type=int, default=16, help="Workers to fetch course pages")
     db.add_argument("--reset", action="store_true", help="Drop existing tables first")
     db.add_argument("--out-dir", help="Override output directory")
     db.add_argument("--cache-dir", help="Directory for HTML cache")
+    db.add_argument("--revalidate", action="store_true", help="Revalidate cached pages with conditional requests (ETag/Last-Modified)")
     db.set_defaults(func=build_db)
 
     viz = sub.add_parser("visualize", help="Render dependency graph from courses DB")
@@ -491,7 +672,7 @@ def build_parser() -> argparse.ArgumentParser:
 
     # Utility: generate a config template
     initc = sub.add_parser("init-config", help="Generate config/cityu.toml template with all settings / 生成包含全部设置的配置模板")
-    initc.add_argument("--path", default=str(Path(__file__).parent / "config" / "cityu.toml"), help="Where to write the config TOML")
+    initc.add_argument("--path", default=str(_CITYU_TOML), help="Where to write the config TOML")
     initc.add_argument("--force", action="store_true", help="Overwrite if file exists")
     def _cmd_init_config(args: argparse.Namespace) -> int:
         target = Path(args.path)
@@ -500,7 +681,7 @@ def build_parser() -> argparse.ArgumentParser:
             print(f"Config already exists: {target}. Use --force to overwrite.")
             return 0
         # Use current bilingual config (if exists) as template source; fallback to minimal internal snippet
-        bilingual_path = Path(__file__).parent / "config" / "cityu.toml"
+        bilingual_path = _CITYU_TOML
         if bilingual_path.exists():
             content = bilingual_path.read_text(encoding="utf-8")
         else:
@@ -520,25 +701,31 @@ def build_parser() -> argparse.ArgumentParser:
         # Resolve config path priority: explicit --config -> profile file -> default cityu.toml
         cfg_path_override = getattr(args, "config", None)
         if not cfg_path_override and getattr(args, "profile", None) in {"dependency", "roots"}:
-            cfg_path_override = str(Path(__file__).parent / "config" / f"visualize_{args.profile}.toml")
+            cfg_path_override = str(_CONFIG_DIR / f"visualize_{args.profile}.toml")
         if not cfg_path_override:
-            default_path = Path(__file__).parent / "config" / "cityu.toml"
-            cfg_path_override = str(default_path) if default_path.exists() else None
+            cfg_path_override = str(_CITYU_TOML) if _CITYU_TOML.exists() else None
         cfg = _load_config(cfg_path_override)
-        print(json.dumps({
+        print(_dumps({
             "config_path": cfg_path_override,
-            "sections": list(cfg.keys()) if isinstance(cfg, dict) else [],
-            "common": cfg.get("common", {}) if isinstance(cfg, dict) else {},
-            "visualize": cfg.get("visualize", {}) if isinstance(cfg, dict) else {},
-        }, ensure_ascii=False, indent=2))
+            "sections": list(cfg),
+            "common": cfg.get("common", {}),
+            "visualize": cfg.get("visualize", {}),
+        }))
         return 0
     sc.set_defaults(func=_cmd_show_config)
 
     return p
 
 
+# Built on first use and reused by later main() calls (tests, batch drivers)
+_PARSER: Optional[argparse.ArgumentParser] = None
+
+
 def main(argv: List[str]) -> int:
-    parser = build_parser()
+    global _PARSER
+    if _PARSER is None:
+        _PARSER = build_parser()
+    parser = _PARSER
     # First pass: parse known args to discover --config and subcommand without enforcing required
     pre_args, _ = parser.parse_known_args(argv)
 
@@ -548,11 +735,10 @@ def main(argv: List[str]) -> int:
     if not cfg_path_override and getattr(pre_args, "command", None) == "visualize":
         profile = getattr(pre_args, "profile", None)
         if profile in {"dependency", "roots"}:
-            base_dir = Path(__file__).parent / "config"
-            cfg_path_override = str(base_dir / f"visualize_{profile}.toml")
+            cfg_path_override = str(_CONFIG_DIR / f"visualize_{profile}.toml")
     cfg = _load_config(cfg_path_override)
+    defaults: dict = {}
     if cfg:
-        defaults: dict = {}
         if isinstance(cfg.get("common"), dict):
             defaults.update(cfg["common"])
         cmd = getattr(pre_args, "command", None)
@@ -560,10 +746,10 @@ def main(argv: List[str]) -> int:
             sect = cmd.replace("-", "_")
             if isinstance(cfg.get(sect), dict):
                 defaults.update(cfg[sect])
-        if defaults:
-            parser.set_defaults(**defaults)
 
-    args = parser.parse_args(argv)
+    # Seed the namespace instead of calling parser.set_defaults(): same precedence,
+    # but the shared parser keeps no config from a previous call
+    args = parser.parse_args(argv, namespace=argparse.Namespace(**defaults))
     return args.func(args)
 
 